@@ -0,0 +1,57 @@
+import os
+import torch
+import torch.nn as nn
+
+# Configuration
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "eager")   # eager | torchscript | onnx
+TORCHSCRIPT_MODEL_PATH = os.getenv("TORCHSCRIPT_MODEL_PATH", "airphynet_scripted.pt")
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "airphynet.onnx")
+QUANTIZE_INT8 = os.getenv("QUANTIZE_INT8", "false").lower() == "true"
+
+BACKENDS = ("eager", "torchscript", "onnx")
+
+
+class OnnxModel:
+    """
+    Runs an exported AirPhyNet through ONNX Runtime behind the same call
+    interface as the torch module: model.eval(); model(input_tensor) -> tensor.
+    """
+
+    def __init__(self, path: str):
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, input_tensor):
+        output = self.session.run(None, {self.input_name: input_tensor.numpy()})[0]
+        return torch.from_numpy(output)
+
+
+def quantize_dynamic_int8(model):
+    """
+    Dynamic int8 quantization of the LSTM and Linear layers for CPU serving.
+    Weights are stored as int8 and activations are quantized on the fly, so no
+    calibration data is needed and the encode/head API keeps working.
+    """
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+
+def load_backend(backend: str, eager_model=None):
+    """
+    Return a callable model for the requested backend.
+
+    `eager` returns the already loaded torch module unchanged; the other backends
+    load the artifacts produced by export_model.py.
+    """
+    if backend == "eager":
+        return eager_model
+    if backend == "torchscript":
+        return torch.jit.load(TORCHSCRIPT_MODEL_PATH, map_location='cpu').eval()
+    if backend == "onnx":
+        return OnnxModel(ONNX_MODEL_PATH)
+    raise ValueError(f"Unknown INFERENCE_BACKEND '{backend}'. Expected one of: {', '.join(BACKENDS)}")
@@ -0,0 +1,130 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from prometheus_client import Histogram
+
+# Configuration
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 32))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", 5))
+
+# Prometheus Metrics
+BATCH_SIZE = Histogram(
+    'predict_batch_size', 'Number of prediction requests merged into one forward pass',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent prediction requests for a short window and runs them
+    through the model as a single batch.
+
+    `predict_fn` receives a list of input windows (all with the same sequence
+    length) and must return one result per window, in order. If `runner` is
+    given (e.g. InferenceExecutor.run), batches are executed through it instead
+    of inline on the event loop.
+    """
+
+    def __init__(self, predict_fn: Callable[[List[Sequence]], Sequence],
+                 max_batch_size: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS,
+                 runner: Optional[Callable[..., Awaitable]] = None):
+        self.predict_fn = predict_fn
+        self.runner = runner
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._pending: List[Tuple[Sequence, asyncio.Future]] = []
+        self._has_items = None
+        self._is_full = None
+        self._worker = None
+        self._flushes = set()
+
+    def start(self):
+        """Start the background batching task on the running event loop"""
+        if self._worker is None:
+            self._has_items = asyncio.Event()
+            self._is_full = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching task, let running batches finish and fail any request still waiting"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+        pending, self._pending = self._pending, []
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Prediction batcher stopped"))
+
+    async def submit(self, window: Sequence):
+        """Queue one input window and wait for its prediction"""
+        if self._worker is None:
+            self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((window, future))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._is_full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+
+            # Give other requests a chance to join, unless the batch is already full
+            if self.max_wait > 0 and len(self._pending) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self._is_full.wait(), timeout=self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            if len(self._pending) < self.max_batch_size:
+                self._is_full.clear()
+            if not self._pending:
+                self._has_items.clear()
+
+            # Run the batch in the background so the next one can start collecting
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[Sequence, asyncio.Future]]):
+        # Windows can only be stacked into one tensor if they share a sequence length
+        groups: Dict[int, List[Tuple[Sequence, asyncio.Future]]] = {}
+        for window, future in batch:
+            if not future.cancelled():
+                groups.setdefault(len(window), []).append((window, future))
+
+        for items in groups.values():
+            BATCH_SIZE.observe(len(items))
+            try:
+                windows = [window for window, _ in items]
+                if self.runner is not None:
+                    results = await self.runner(self.predict_fn, windows)
+                else:
+                    results = self.predict_fn(windows)
+                if len(results) != len(windows):
+                    # Results are matched to requests by position, so none of them can be trusted
+                    raise RuntimeError(f"Model returned {len(results)} predictions for {len(windows)} inputs")
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
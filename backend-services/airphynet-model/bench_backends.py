@@ -0,0 +1,81 @@
+"""
+CPU benchmark of the serving backends: eager PyTorch, TorchScript and ONNX Runtime.
+
+Exports the model to a temporary directory and reports single-request latency
+(batch of 1, like an unbatched /predict) and batch throughput (like the
+micro-batcher under load):
+
+    python bench_backends.py --weights airphynet_weights.pth --batch_size 64
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from backends import OnnxModel
+from export_model import export_onnx, export_torchscript, load_model
+from model import create_model
+
+
+def time_calls(model, input_tensor, iterations, warmup=20):
+    with torch.no_grad():
+        for _ in range(warmup):
+            model(input_tensor)
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            model(input_tensor)
+            latencies.append(time.perf_counter() - start)
+    return np.array(latencies)
+
+
+def main(args):
+    torch.set_num_threads(args.threads)
+    if os.path.exists(args.weights):
+        model = load_model(weights_path=args.weights)
+    else:
+        print(f"{args.weights} not found, benchmarking a randomly initialised model")
+        model = create_model()
+    model.eval()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        torchscript_path = os.path.join(tmp, "airphynet_scripted.pt")
+        onnx_path = os.path.join(tmp, "airphynet.onnx")
+        export_torchscript(model, torchscript_path)
+        export_onnx(model, onnx_path, args.seq_length)
+
+        backends = {
+            "eager": model,
+            "torchscript": torch.jit.load(torchscript_path).eval(),
+            "onnx": OnnxModel(onnx_path),
+        }
+
+        single = torch.randn(1, args.seq_length, model.lstm.input_size)
+        batch = torch.randn(args.batch_size, args.seq_length, model.lstm.input_size)
+        with torch.no_grad():
+            reference = model(batch)
+
+        print(f"\nthreads={args.threads}  seq_len={args.seq_length}  batch={args.batch_size}")
+        print(f"{'backend':<12} {'p50 (ms)':>9} {'p99 (ms)':>9} {'batch (ms)':>11} {'windows/s':>11} {'max |diff|':>11}")
+        for name, backend in backends.items():
+            latencies = time_calls(backend, single, args.iterations) * 1000
+            batch_latencies = time_calls(backend, batch, max(1, args.iterations // 10))
+            with torch.no_grad():
+                diff = (backend(batch) - reference).abs().max().item()
+            print(
+                f"{name:<12} {np.percentile(latencies, 50):>9.3f} {np.percentile(latencies, 99):>9.3f} "
+                f"{np.median(batch_latencies) * 1000:>11.3f} {args.batch_size / np.median(batch_latencies):>11.0f} {diff:>11.2e}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", type=str, default="airphynet_weights.pth")
+    parser.add_argument("--seq_length", type=int, default=10)
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=1)
+    main(parser.parse_args())
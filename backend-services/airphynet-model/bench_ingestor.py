@@ -0,0 +1,108 @@
+"""
+Throughput benchmark: threaded ingestor.py vs asyncio ingestor_async.py.
+
+Starts each ingestor against a local broker and MongoDB, publishes a burst of
+QoS1 telemetry and times how long until every message is written (polled from
+ingestor_messages_total{result="written"} on the ingestor's metrics port), e.g.:
+
+    docker run -d -p 1883:1883 eclipse-mosquitto:2 mosquitto -c /mosquitto-no-auth.conf
+    docker run -d -p 27017:27017 mongo:7
+    python bench_ingestor.py --messages 50000
+
+Both variants share the batching settings from .env (INGESTOR_BATCH_SIZE,
+INGESTOR_FLUSH_INTERVAL_MS); the threaded one writes with INGESTOR_WORKERS
+threads, the async one with INGESTOR_MAX_INFLIGHT_WRITES concurrent batches.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+import paho.mqtt.client as mqtt
+from prometheus_client.parser import text_string_to_metric_families
+from pymongo import MongoClient
+
+BENCH_DB = "aqi_benchmark"
+BENCH_TOPIC = "bench/sensor/+/telemetry"
+VARIANTS = {"threaded": "ingestor.py", "async": "ingestor_async.py"}
+
+
+def written(metrics_port):
+    """ingestor_messages_total{result="written"}, or None while the metrics server is not up"""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{metrics_port}/metrics", timeout=1) as response:
+            text = response.read().decode()
+    except OSError:
+        return None
+    for family in text_string_to_metric_families(text):
+        if family.name == "ingestor_messages":
+            for sample in family.samples:
+                if sample.name == "ingestor_messages_total" and sample.labels.get("result") == "written":
+                    return int(sample.value)
+    return 0
+
+
+def publish(args, count):
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    client.max_inflight_messages_set(1000)
+    client.connect(args.broker, args.port)
+    client.loop_start()
+    for i in range(count):
+        payload = {"temperature": 25.0, "humidity": 50.0, "co2_ppm": 400.0 + i % 800, "aqi_calculated": 50}
+        client.publish(BENCH_TOPIC.replace("+", f"bench_{i % args.sensors}"), json.dumps(payload), qos=1)
+    return client
+
+
+def run(args, variant):
+    MongoClient(args.uri).drop_database(BENCH_DB)
+    env = dict(
+        os.environ, MONGODB_URI=args.uri, DB_NAME=BENCH_DB, MQTT_BROKER=args.broker, MQTT_PORT=str(args.port),
+        MQTT_TOPIC=BENCH_TOPIC, MQTT_USERNAME="", MQTT_PASSWORD="", MQTT_TRANSPORT="tcp", MQTT_CLIENT_ID="",
+        MQTT_SHARE_GROUP="", INGESTOR_METRICS_PORT=str(args.metrics_port), LOG_LEVEL="WARNING"
+    )
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), VARIANTS[variant])
+    ingestor = subprocess.Popen([sys.executable, script], env=env)
+    try:
+        while written(args.metrics_port) is None:
+            time.sleep(0.1)
+        time.sleep(1.0)   # Let it subscribe
+
+        start = time.perf_counter()
+        publisher = publish(args, args.messages)
+        done = 0
+        while done < args.messages:
+            if time.perf_counter() - start > args.timeout:
+                print(f"{variant:<9} timed out with {done}/{args.messages} written")
+                return
+            time.sleep(0.05)
+            done = written(args.metrics_port) or 0
+        elapsed = time.perf_counter() - start
+        publisher.loop_stop()
+        publisher.disconnect()
+        print(f"{variant:<9} {args.messages} messages in {elapsed:6.2f}s   {args.messages / elapsed:>9.1f} msg/s")
+    finally:
+        ingestor.send_signal(signal.SIGTERM)
+        ingestor.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default=os.getenv("BENCH_MONGODB_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--broker", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--metrics_port", type=int, default=9101)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--sensors", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    args = parser.parse_args()
+
+    try:
+        for variant in args.variants:
+            run(args, variant)
+    finally:
+        MongoClient(args.uri).drop_database(BENCH_DB)
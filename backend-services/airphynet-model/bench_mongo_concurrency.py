@@ -0,0 +1,104 @@
+"""
+Concurrency benchmark: blocking pymongo vs async motor inside asyncio handlers.
+
+Simulates N concurrent /predict-style requests (window read + prediction insert)
+against a local MongoDB stand-in, e.g.:
+
+    docker run -d -p 27017:27017 mongo:7
+    python bench_mongo_concurrency.py --requests 2000
+
+"before" calls pymongo directly from coroutines, exactly like the old handlers,
+so every query blocks the event loop. "after" awaits the same queries through
+the pooled motor client used by inference_api.py.
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+from pymongo import MongoClient
+
+from mongo import create_async_client
+
+BENCH_DB = "aqi_benchmark"
+
+
+def seed(uri, sensors):
+    collection = MongoClient(uri)[BENCH_DB].sensor_logs
+    collection.drop()
+    docs = []
+    for s in range(sensors):
+        for i in range(24):
+            docs.append({
+                "sensor_id": f"bench_{s}", "temperature": 25.0, "humidity": 50.0,
+                "co2_ppm": 400.0 + i, "aqi_calculated": 50, "received_at": datetime.utcnow()
+            })
+    collection.insert_many(docs)
+    collection.create_index([("sensor_id", 1), ("received_at", -1)])
+
+
+async def run_blocking(db, sensors, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            list(db.sensor_logs.find({"sensor_id": f"bench_{i % sensors}"}).sort("received_at", -1).limit(24))
+            db.predictions.insert_one({"sensor_id": f"bench_{i % sensors}", "generated_at": datetime.utcnow()})
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - start, latencies
+
+
+async def run_async(db, sensors, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            cursor = db.sensor_logs.find({"sensor_id": f"bench_{i % sensors}"}).sort("received_at", -1).limit(24)
+            await cursor.to_list(length=24)
+            await db.predictions.insert_one({"sensor_id": f"bench_{i % sensors}", "generated_at": datetime.utcnow()})
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - start, latencies
+
+
+def report(label, concurrency, total, elapsed, latencies):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{label:<10} c={concurrency:<4} {total / elapsed:>9.1f} req/s   p50={p50:7.2f} ms   p99={p99:7.2f} ms")
+
+
+async def main(args):
+    sync_db = MongoClient(args.uri)[BENCH_DB]
+    async_db = create_async_client(args.uri)[BENCH_DB]
+
+    for concurrency in args.concurrency:
+        elapsed, latencies = await run_blocking(sync_db, args.sensors, args.requests, concurrency)
+        report("pymongo", concurrency, args.requests, elapsed, latencies)
+        elapsed, latencies = await run_async(async_db, args.sensors, args.requests, concurrency)
+        report("motor", concurrency, args.requests, elapsed, latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default=os.getenv("BENCH_MONGODB_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--sensors", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+
+    print(f"Seeding {args.sensors} sensors into {BENCH_DB} on {args.uri}...")
+    seed(args.uri, args.sensors)
+    try:
+        asyncio.run(main(args))
+    finally:
+        MongoClient(args.uri).drop_database(BENCH_DB)
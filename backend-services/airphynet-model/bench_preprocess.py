@@ -0,0 +1,122 @@
+"""
+Microbenchmark of model input preparation: the previous per-call path (float64
+np.array, fresh mean/std arrays, FloatTensor copy, torch.cat, h0/c0 zeros) against
+the float32 InputBuffer used by predict_aqi_batch now.
+
+Reports latency and allocations per call (CPU tensor storage from the torch
+profiler, peak numpy/Python memory from tracemalloc) for input preparation
+alone and for a full predict_aqi_batch:
+
+    python bench_preprocess.py --batch_size 32 --iterations 2000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import torch
+from torch.profiler import ProfilerActivity, profile
+
+import model as ops
+
+
+# --- PREVIOUS PATH (for comparison) ---
+
+def legacy_preprocess(data):
+    data_array = np.array(data)
+    means = np.array([30.0, 60.0, 1000.0, 100.0])
+    stds = np.array([10.0, 20.0, 500.0, 50.0])
+    return torch.FloatTensor((data_array - means) / (stds + 1e-8)).unsqueeze(0)
+
+
+def legacy_input(windows):
+    return torch.cat([legacy_preprocess(window) for window in windows], dim=0)
+
+
+def legacy_predict(model, windows):
+    model.eval()
+    with torch.no_grad():
+        input_tensor = legacy_input(windows)
+        h0 = torch.zeros(model.num_layers, input_tensor.size(0), model.hidden_size)
+        c0 = torch.zeros(model.num_layers, input_tensor.size(0), model.hidden_size)
+        lstm_out, _ = model.lstm(input_tensor, (h0, c0))
+        prediction = model.head(lstm_out[:, -1, :])
+        return torch.clamp(prediction * 100, 0, 5000).tolist()
+
+
+# --- MEASUREMENT ---
+
+def latency_us(fn, iterations, warmup=50):
+    for _ in range(warmup):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def python_peak_bytes(fn, iterations=200):
+    """Peak bytes held per call through Python/numpy allocators (tracemalloc)"""
+    fn()
+    tracemalloc.start()
+    total = 0
+    for _ in range(iterations):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn()
+        total += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return total / iterations
+
+
+def torch_allocations(fn, iterations=50):
+    """CPU tensor storage allocations (count, bytes) per call, from the torch profiler"""
+    fn()
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        for _ in range(iterations):
+            fn()
+    allocations = [event.cpu_memory_usage for event in prof.events() if event.cpu_memory_usage > 0]
+    return len(allocations) / iterations, sum(allocations) / iterations
+
+
+def main(args):
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+    model = ops.create_model()
+    model.eval()
+
+    rng = np.random.default_rng(0)
+    low, high = [20.0, 40.0, 400.0, 0.0], [40.0, 80.0, 2000.0, 300.0]
+
+    print(f"threads={args.threads}  seq_len={args.seq_length}  iterations={args.iterations}")
+    print(f"{'stage':<10} {'batch':>5} {'path':<9} {'µs/call':>9} {'torch allocs':>13} {'torch KiB':>10} {'peak py KiB':>12}")
+    for batch_size in sorted({1, args.batch_size}):
+        windows = rng.uniform(low, high, size=(batch_size, args.seq_length, 4)).tolist()
+
+        # Both paths must produce the same forecast
+        diff = np.abs(np.array(legacy_predict(model, windows)) - np.array(ops.predict_aqi_batch(model, windows))).max()
+        assert diff < 1e-2, f"forecasts differ by {diff}"
+
+        cases = [
+            ("input", "previous", lambda: legacy_input(windows)),
+            ("input", "buffer", lambda: ops.input_buffer().fill(windows)),
+            ("predict", "previous", lambda: legacy_predict(model, windows)),
+            ("predict", "buffer", lambda: ops.predict_aqi_batch(model, windows)),
+        ]
+        for stage, path, fn in cases:
+            micros = latency_us(fn, args.iterations)
+            torch_count, torch_bytes = torch_allocations(fn)
+            python_peak = python_peak_bytes(fn)
+            print(
+                f"{stage:<10} {batch_size:>5} {path:<9} {micros:>9.1f} {torch_count:>13.1f} "
+                f"{torch_bytes / 1024:>10.1f} {python_peak / 1024:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seq_length", type=int, default=10)
+    parser.add_argument("--batch_size", type=int, default=32)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=1)
+    main(parser.parse_args())
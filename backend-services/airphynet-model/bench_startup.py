@@ -0,0 +1,79 @@
+"""
+Cold-start benchmark for the inference service.
+
+Starts `uvicorn inference_api:app` in a fresh process several times and reports
+how long it takes until /health/live answers (port bound) and until
+/health/ready answers 200 (model loaded and warmed up). For comparison it also
+times importing the model stack (torch, numpy, mlflow.pytorch), which used to
+happen before the port was bound:
+
+    python bench_startup.py --runs 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+
+def time_heavy_imports():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import torch, numpy, mlflow.pytorch"], check=True)
+    return time.perf_counter() - start
+
+
+def wait_for(url, deadline, expect_ok=False):
+    while time.perf_counter() < deadline:
+        try:
+            r = requests.get(url, timeout=1)
+            if not expect_ok or r.status_code == 200:
+                return time.perf_counter()
+        except requests.RequestException:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} did not respond in time")
+
+
+def time_startup(port, timeout):
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "inference_api:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = start + timeout
+        live_at = wait_for(f"{base_url}/health/live", deadline)
+        ready_at = wait_for(f"{base_url}/health/ready", deadline, expect_ok=True)
+        return live_at - start, ready_at - start
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(args):
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    print(f"--- Inference Service Cold Start ({args.runs} runs) ---")
+
+    imports = time_heavy_imports()
+    print(f"torch + numpy + mlflow.pytorch import: {imports:.2f}s (no longer blocks binding the port)")
+
+    live_times, ready_times = [], []
+    for run in range(1, args.runs + 1):
+        live, ready = time_startup(args.port, args.timeout)
+        live_times.append(live)
+        ready_times.append(ready)
+        print(f"run {run}: live after {live:.2f}s, ready after {ready:.2f}s")
+
+    print(f"\nmedian: live {sorted(live_times)[len(live_times) // 2]:.2f}s, "
+          f"ready {sorted(ready_times)[len(ready_times) // 2]:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for readiness per run")
+    main(parser.parse_args())
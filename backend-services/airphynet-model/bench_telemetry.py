@@ -0,0 +1,126 @@
+"""
+Payload size, decode+validate throughput and validation parity of the telemetry
+encodings accepted by /ingest: JSON (json.loads + Pydantic, the previous path;
+and Pydantic's own JSON parser, the current path), fixed struct and MessagePack.
+
+    python bench_telemetry.py --readings 50000
+"""
+import argparse
+import json
+import math
+import time
+
+from inference_api import SensorData
+from telemetry_codec import decode_msgpack, decode_struct, encode_msgpack, encode_struct
+
+
+def make_readings(count):
+    return [{
+        "sensor_id": f"device_{i % 50:03d}",
+        "temperature": 25.0 + (i % 100) * 0.1,
+        "humidity": 40.0 + (i % 40),
+        "co2_ppm": 420.0 + (i % 900),
+        "aqi": 20 + (i % 150),
+        "rssi": -40 - (i % 50),
+        "uptime_seconds": 3600 + i
+    } for i in range(count)]
+
+
+def json_loads_pydantic(payload):
+    return SensorData(**json.loads(payload))
+
+
+def pydantic_json(payload):
+    return SensorData.model_validate_json(payload)
+
+
+# The two binary paths below mirror read_telemetry in inference_api.py
+def struct_pydantic(payload):
+    return SensorData.model_validate(decode_struct(payload))
+
+
+def msgpack_pydantic(payload):
+    return SensorData.model_validate(decode_msgpack(payload, validate=False))
+
+
+# (name, encoder, decode+validate) in the order they are reported
+PATHS = [
+    ("json.loads + Pydantic", lambda r: json.dumps(r).encode(), json_loads_pydantic),
+    ("Pydantic JSON parser", lambda r: json.dumps(r).encode(), pydantic_json),
+    ("struct + Pydantic", lambda r: encode_struct(r, include_sensor_id="sensor_id" in r), struct_pydantic),
+    ("MessagePack + Pydantic", encode_msgpack, msgpack_pydantic),
+]
+
+# Readings every path must reject (struct cannot express wrong types, only missing ids)
+INVALID_READINGS = [
+    {"temperature": 25.0, "humidity": 50.0, "co2_ppm": 500.0, "aqi": 40},
+    {"sensor_id": "x", "temperature": "hot", "humidity": 50.0, "co2_ppm": 500.0, "aqi": 40},
+    {"sensor_id": "x", "humidity": 50.0, "co2_ppm": 500.0, "aqi": 40},
+    {"sensor_id": "x", "temperature": 25.0, "humidity": 50.0, "co2_ppm": 500.0, "aqi": 40.5},
+    {"sensor_id": "x", "temperature": 25.0, "humidity": [50.0], "co2_ppm": 500.0, "aqi": 40},
+]
+
+
+def rejects(decode, payload):
+    try:
+        decode(payload)
+    except Exception:
+        return True
+    return False
+
+
+def check_parity():
+    print("--- Validation parity (invalid readings rejected) ---")
+    ok = True
+    for name, encode, decode in PATHS:
+        rejected, total = 0, 0
+        for reading in INVALID_READINGS:
+            try:
+                payload = encode(reading)
+            except Exception:
+                continue   # Not representable in this encoding
+            total += 1
+            rejected += rejects(decode, payload)
+        # Truncated payloads
+        total += 1
+        rejected += rejects(decode, encode(make_readings(1)[0])[:-3])
+        ok &= rejected == total
+        print(f"{name:<24} {rejected}/{total} rejected")
+    return ok
+
+
+def bench(readings, repeat):
+    print("\n--- Size and decode + validate throughput ---")
+    baseline = None
+    for name, encode, decode in PATHS:
+        payloads = [encode(reading) for reading in readings]
+        size = sum(len(payload) for payload in payloads) / len(payloads)
+
+        # Decoded readings must match the JSON path (fixed-point rounding aside)
+        decoded = decode(payloads[0]).model_dump()
+        assert all(math.isclose(decoded[k], v, rel_tol=1e-6) if isinstance(v, float) else decoded[k] == v
+                   for k, v in readings[0].items()), name
+
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for payload in payloads:
+                decode(payload)
+            best = min(best, time.perf_counter() - start)
+        rate = len(payloads) / best
+        baseline = baseline or rate
+        print(f"{name:<24} {size:>6.1f} bytes   {rate:>10.0f} readings/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readings", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    parity = check_parity()
+    bench(make_readings(args.readings), args.repeat)
+    if not parity:
+        print("\n❌ A binary path accepted a reading the JSON path rejects")
+        raise SystemExit(1)
+    print("\n✅ Binary decoders reject everything the JSON path rejects")
@@ -0,0 +1,124 @@
+"""
+Accuracy-parity and latency/memory report for dynamic int8 quantization.
+
+Runs the fp32 model and its int8 counterpart on windows built from the processed
+legacy CSVs and exits with code 1 if the int8 predictions drift from fp32 by more
+than --tolerance (mean absolute error relative to the fp32 output range):
+
+    python check_quantization.py --weights airphynet_weights.pth
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import torch
+
+from backends import quantize_dynamic_int8
+from export_model import load_model
+from model import create_model
+
+script_dir = Path(__file__).resolve().parent
+LEGACY_DATA_DIR = script_dir.parent.parent / "_unused_legacy_eksperimen" / "data" / "processed"
+LEGACY_FEATURES = ['pm10', 'so2', 'co', 'o3', 'no2']
+
+
+def load_windows(csv_paths, input_size, seq_length):
+    """Build [N, seq_length, input_size] windows the same way train.py does for legacy data"""
+    windows = []
+    for path in csv_paths:
+        df = pd.read_csv(path)
+        df['tanggal'] = pd.to_datetime(df['tanggal'])
+        df = df.sort_values('tanggal')
+        hour = df['tanggal'].dt.hour
+        df['hour_sin'] = np.sin(2 * np.pi * hour / 24)
+        df['hour_cos'] = np.cos(2 * np.pi * hour / 24)
+
+        values = df[LEGACY_FEATURES + ['hour_sin', 'hour_cos']].ffill().fillna(0).values.astype(np.float32)
+        # Serving models use 4 features; reuse the leading (already standardized) legacy columns
+        if values.shape[1] >= input_size:
+            values = values[:, :input_size]
+        else:
+            values = np.pad(values, ((0, 0), (0, input_size - values.shape[1])))
+
+        for i in range(len(values) - seq_length):
+            windows.append(values[i:i + seq_length])
+    return torch.from_numpy(np.stack(windows))
+
+
+def model_size_bytes(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
+
+
+def latency_ms(model, input_tensor, iterations):
+    with torch.no_grad():
+        for _ in range(10):
+            model(input_tensor)
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            model(input_tensor)
+            timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1000, np.percentile(timings, 99) * 1000
+
+
+def main(args):
+    torch.set_num_threads(args.threads)
+    if args.model_uri or os.path.exists(args.weights):
+        fp32_model = load_model(args.model_uri, args.weights)
+    else:
+        print(f"{args.weights} not found, checking a randomly initialised model")
+        fp32_model = create_model()
+    fp32_model.eval()
+    # quantize_dynamic works on a copy, so fp32_model stays untouched
+    int8_model = quantize_dynamic_int8(fp32_model)
+
+    csv_paths = args.data_paths or sorted(str(p) for p in LEGACY_DATA_DIR.glob("*.csv"))
+    windows = load_windows(csv_paths, fp32_model.lstm.input_size, args.seq_length)
+    print(f"Parity check on {len(windows)} windows from {len(csv_paths)} CSV file(s)")
+
+    with torch.no_grad():
+        fp32_out = fp32_model(windows)
+        int8_out = int8_model(windows)
+
+    abs_err = (int8_out - fp32_out).abs()
+    output_range = (fp32_out.max() - fp32_out.min()).item() + 1e-8
+    relative_mae = abs_err.mean().item() / output_range
+    correlation = np.corrcoef(fp32_out.flatten().numpy(), int8_out.flatten().numpy())[0, 1]
+
+    print("\n--- Accuracy parity (int8 vs fp32) ---")
+    print(f"MAE: {abs_err.mean().item():.6f}   Max abs error: {abs_err.max().item():.6f}")
+    print(f"Relative MAE: {relative_mae:.4%}   Pearson r: {correlation:.6f}")
+
+    print("\n--- Latency (ms) / Memory ---")
+    single = windows[:1]
+    batch = windows[:args.batch_size]
+    for name, model in (("fp32", fp32_model), ("int8", int8_model)):
+        p50, p99 = latency_ms(model, single, args.iterations)
+        batch_p50, _ = latency_ms(model, batch, max(1, args.iterations // 10))
+        print(f"{name}: batch=1 p50={p50:.3f} p99={p99:.3f}   batch={len(batch)} p50={batch_p50:.3f}   "
+              f"weights={model_size_bytes(model) / 1024:.1f} KiB")
+
+    if relative_mae > args.tolerance:
+        print(f"\n❌ int8 model exceeds tolerance ({relative_mae:.4%} > {args.tolerance:.2%})")
+        sys.exit(1)
+    print(f"\n✅ int8 model within tolerance ({relative_mae:.4%} <= {args.tolerance:.2%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_uri", type=str, default=os.getenv("MLFLOW_MODEL_URI"))
+    parser.add_argument("--weights", type=str, default="airphynet_weights.pth")
+    parser.add_argument("--data_paths", type=str, nargs="*", help="CSV files (default: processed legacy CSVs)")
+    parser.add_argument("--seq_length", type=int, default=10)
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Max MAE relative to the fp32 output range")
+    main(parser.parse_args())
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from prometheus_client import Counter, Gauge
+
+# Configuration
+TELEMETRY_DEDUP = os.getenv("TELEMETRY_DEDUP", "true").lower() == "true"
+TELEMETRY_DEDUP_MAX_KEYS = int(os.getenv("TELEMETRY_DEDUP_MAX_KEYS", 100000))            # In-memory filter size
+TELEMETRY_DEDUP_WINDOW_SECONDS = float(os.getenv("TELEMETRY_DEDUP_WINDOW_SECONDS", 600))  # Redelivery window it covers
+
+# Partial unique index on sensor_logs: catches the duplicates the in-memory filter missed
+# (after a restart, beyond the window, or in another ingestor of the share group)
+DEDUP_INDEX_NAME = "sensor_id_dedup_key_unique"
+DEDUP_INDEX_KEYS = [("sensor_id", 1), ("dedup_key", 1)]
+DEDUP_INDEX_OPTIONS = {
+    "name": DEDUP_INDEX_NAME, "unique": True, "partialFilterExpression": {"dedup_key": {"$exists": True}},
+}
+
+# Prometheus Metrics (hit rate: telemetry_duplicates_total / telemetry_dedup_lookups_total)
+DEDUP_LOOKUPS = Counter('telemetry_dedup_lookups_total', 'Telemetry messages checked for duplicates')
+DUPLICATES = Counter(
+    'telemetry_duplicates_total', 'Duplicate telemetry messages dropped, by the layer that caught them', ['layer']
+)
+DEDUP_KEYS = Gauge('telemetry_dedup_keys', 'Keys held by the in-memory duplicate filter')
+MEMORY_DUPLICATES = DUPLICATES.labels(layer="memory")
+INDEX_DUPLICATES = DUPLICATES.labels(layer="index")
+
+# DedupFilter.claim results
+CLAIMED = "claimed"
+DUPLICATE = "duplicate"
+IN_FLIGHT = "in_flight"
+
+
+def dedup_key(reading: dict, payload: bytes) -> Optional[str]:
+    """
+    Identity of one reading on its device: the device sequence number or
+    timestamp (`ts` or `timestamp`) if it sends one, else its uptime. Uptime restarts at boot, so it
+    is combined with a digest of the payload; a redelivered or re-forwarded
+    message has the same bytes. None if the reading carries none of them.
+    """
+    for field in ("seq", "ts", "timestamp"):
+        value = reading.get(field)
+        if value is not None:
+            return f"{field}:{value}"
+    uptime = reading.get("uptime", reading.get("uptime_seconds"))
+    if uptime is not None:
+        return f"up:{uptime}:{hashlib.blake2b(payload, digest_size=8).hexdigest()}"
+    return None
+
+
+def is_dedup_index_error(write_error: dict) -> bool:
+    """True for a duplicate key error raised by the dedup index (not by _id)"""
+    return "dedup_key" in write_error.get("keyPattern", {}) or DEDUP_INDEX_NAME in write_error.get("errmsg", "")
+
+
+class DedupFilter:
+    """
+    Time-windowed LRU set of recently written (sensor_id, dedup_key) pairs. Only
+    a 64-bit hash of each pair is kept, in commit order, so expiry and the
+    `max_keys` bound both pop from the front. A pair is claimed while its
+    reading is being written and only counts as seen once the write is
+    committed, so a copy that arrives in between is held (not acknowledged)
+    until the outcome is known. Thread-safe.
+    """
+
+    def __init__(self, max_keys: int = TELEMETRY_DEDUP_MAX_KEYS, window_seconds: float = TELEMETRY_DEDUP_WINDOW_SECONDS):
+        self.max_keys = max(1, max_keys)
+        self.window_seconds = window_seconds
+        self._seen: "OrderedDict[int, float]" = OrderedDict()   # hash -> committed at (monotonic)
+        self._pending: Dict[int, List[object]] = {}              # hash -> copies held until the write settles
+        self._lock = threading.Lock()
+        DEDUP_KEYS.set_function(self.__len__)
+
+    def __len__(self):
+        return len(self._seen) + len(self._pending)
+
+    def claim(self, sensor_id: Optional[str], key: Optional[str], message=None) -> str:
+        """
+        CLAIMED if the pair is new: write the reading, then `commit` (or `release`
+        if the write is abandoned). DUPLICATE if it was written within the window.
+        IN_FLIGHT if another copy is still being written: `message` is held and
+        handed back by `commit` or `release`.
+        """
+        if key is None:
+            return CLAIMED
+        DEDUP_LOOKUPS.inc()
+        digest = hash((sensor_id, key))
+        now = time.monotonic()
+        with self._lock:
+            cutoff = now - self.window_seconds
+            while self._seen:
+                committed_at = next(iter(self._seen.values()))
+                if committed_at > cutoff:
+                    break
+                self._seen.popitem(last=False)
+
+            if digest in self._seen:
+                MEMORY_DUPLICATES.inc()
+                return DUPLICATE
+            held = self._pending.get(digest)
+            if held is not None:
+                MEMORY_DUPLICATES.inc()
+                if message is not None:
+                    held.append(message)
+                return IN_FLIGHT
+            self._pending[digest] = []
+        return CLAIMED
+
+    def commit(self, sensor_id: Optional[str], key: Optional[str]) -> List[object]:
+        """The claimed reading is stored (MongoDB or spool); returns the copies held meanwhile, to acknowledge"""
+        if key is None:
+            return []
+        digest = hash((sensor_id, key))
+        with self._lock:
+            held = self._pending.pop(digest, [])
+            self._seen[digest] = time.monotonic()
+            self._seen.move_to_end(digest)
+            if len(self._seen) > self.max_keys:
+                self._seen.popitem(last=False)
+        return held
+
+    def release(self, sensor_id: Optional[str], key: Optional[str]) -> List[object]:
+        """Forget a claim whose write was abandoned; returns the held copies, left for redelivery"""
+        if key is None:
+            return []
+        with self._lock:
+            return self._pending.pop(hash((sensor_id, key)), [])
+
+    def seen(self, sensor_id: Optional[str], key: Optional[str]) -> bool:
+        """True if the pair was already seen within the window; otherwise records it (claim and commit at once)"""
+        if self.claim(sensor_id, key) != CLAIMED:
+            return True
+        self.commit(sensor_id, key)
+        return False
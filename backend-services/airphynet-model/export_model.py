@@ -0,0 +1,71 @@
+import argparse
+import os
+
+import torch
+
+from backends import quantize_dynamic_int8
+from model import create_model
+
+
+def load_model(model_uri=None, weights_path="airphynet_weights.pth"):
+    """Load AirPhyNet from the MLflow registry or from local weights"""
+    if model_uri:
+        import mlflow.pytorch
+        print(f"Loading model from MLflow: {model_uri}")
+        return mlflow.pytorch.load_model(model_uri)
+
+    state_dict = torch.load(weights_path, map_location='cpu')
+    model = create_model(output_size=state_dict["output_layer.weight"].shape[0])
+    model.load_state_dict(state_dict)
+    print(f"Loaded model weights from {weights_path}")
+    return model
+
+
+def export_torchscript(model, path):
+    """Compile the model (including encode/head for incremental inference) to TorchScript"""
+    model.eval()
+    scripted = torch.jit.script(model)
+    scripted.save(path)
+    print(f"✅ TorchScript model saved to {path}")
+
+
+def export_onnx(model, path, seq_length=10):
+    """Export the forward pass to ONNX with dynamic batch and sequence length"""
+    model.eval()
+    dummy_input = torch.zeros(2, seq_length, model.lstm.input_size)
+    torch.onnx.export(
+        model, dummy_input, path,
+        input_names=["input"], output_names=["forecast"],
+        dynamic_axes={"input": {0: "batch", 1: "seq_len"}, "forecast": {0: "batch"}},
+        opset_version=17
+    )
+    print(f"✅ ONNX model saved to {path}")
+
+
+def quantize_onnx(path):
+    """Apply ONNX Runtime dynamic int8 quantization to an exported model, in place"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    fp32_path = path + ".fp32"
+    os.replace(path, fp32_path)
+    quantize_dynamic(fp32_path, path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    print(f"✅ ONNX model quantized to int8 at {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export AirPhyNet to TorchScript and ONNX for serving")
+    parser.add_argument("--model_uri", type=str, default=os.getenv("MLFLOW_MODEL_URI"), help="MLflow model URI (default: MLFLOW_MODEL_URI)")
+    parser.add_argument("--weights", type=str, default="airphynet_weights.pth", help="Local weights used when no model URI is given")
+    parser.add_argument("--torchscript_path", type=str, default=os.getenv("TORCHSCRIPT_MODEL_PATH", "airphynet_scripted.pt"))
+    parser.add_argument("--onnx_path", type=str, default=os.getenv("ONNX_MODEL_PATH", "airphynet.onnx"))
+    parser.add_argument("--seq_length", type=int, default=10)
+    parser.add_argument("--quantize", action="store_true", help="Export dynamic int8 quantized artifacts")
+
+    args = parser.parse_args()
+    model = load_model(args.model_uri, args.weights)
+    export_torchscript(quantize_dynamic_int8(model) if args.quantize else model, args.torchscript_path)
+    # ONNX is exported in fp32 and quantized by ONNX Runtime's own tooling
+    export_onnx(model, args.onnx_path, args.seq_length)
+    if args.quantize:
+        quantize_onnx(args.onnx_path)
@@ -0,0 +1,59 @@
+import os
+from datetime import datetime
+from typing import List
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Configuration
+FORECAST_PRECOMPUTE_INTERVAL_MINUTES = float(os.getenv("FORECAST_PRECOMPUTE_INTERVAL_MINUTES", 0))   # 0 = disabled
+FORECAST_ACTIVE_MINUTES = float(os.getenv("FORECAST_ACTIVE_MINUTES", 60))   # Sensors with a reading this recent
+FORECAST_PRECOMPUTE_HOURS = int(os.getenv("FORECAST_PRECOMPUTE_HOURS", 6))
+FORECAST_SEQ_LENGTH = 10   # Readings per window, same as /predict
+
+# Prometheus Metrics
+FORECAST_PRECOMPUTE_SENSORS = Gauge('forecast_precompute_sensors', 'Sensors forecast by the last scheduled run')
+FORECAST_PRECOMPUTE_SECONDS = Histogram(
+    'forecast_precompute_seconds', 'Time per stage of a scheduled fleet forecast run', ['stage']
+)
+FORECAST_PRECOMPUTE_FAILURES = Counter('forecast_precompute_failures_total', 'Scheduled fleet forecast runs that failed')
+
+
+def latest_windows_pipeline(active_since: datetime, seq_length: int = FORECAST_SEQ_LENGTH) -> List[dict]:
+    """
+    Aggregation on sensor_logs returning, for every sensor with a reading since
+    `active_since`, its `seq_length` newest readings (newest first) in `readings`.
+    The per-sensor lookup uses the (sensor_id, received_at) index.
+    """
+    return [
+        {"$match": {"received_at": {"$gte": active_since}}},
+        {"$group": {"_id": "$sensor_id"}},
+        {"$lookup": {
+            "from": "sensor_logs",
+            "let": {"sensor_id": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$sensor_id", "$$sensor_id"]}}},
+                {"$sort": {"received_at": -1}},
+                {"$limit": seq_length},
+                # Same defaults /predict uses for missing fields
+                {"$project": {
+                    "_id": 0,
+                    "received_at": 1,
+                    "temperature": {"$ifNull": ["$temperature", 25.0]},
+                    "humidity": {"$ifNull": ["$humidity", 50.0]},
+                    "co2_ppm": {"$ifNull": ["$co2_ppm", 400.0]},
+                    "aqi_calculated": {"$ifNull": ["$aqi_calculated", 50]},
+                }},
+            ],
+            "as": "readings",
+        }},
+        # Skip sensors without a full window
+        {"$match": {f"readings.{seq_length - 1}": {"$exists": True}}},
+    ]
+
+
+def window_from_readings(readings: List[dict]) -> List[List[float]]:
+    """Model input (Temp, Hum, CO2, AQI), oldest first, from newest-first aggregation output"""
+    return [
+        [reading["temperature"], reading["humidity"], reading["co2_ppm"], reading["aqi_calculated"]]
+        for reading in reversed(readings)
+    ]
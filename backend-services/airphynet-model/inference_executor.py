@@ -0,0 +1,76 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Configuration
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 1))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", 64))              # Max jobs waiting or running
+INFERENCE_INTRA_OP_THREADS = int(os.getenv("INFERENCE_INTRA_OP_THREADS", 0))   # 0 = torch default
+INFERENCE_INTER_OP_THREADS = int(os.getenv("INFERENCE_INTER_OP_THREADS", 0))   # 0 = torch default
+
+# Prometheus Metrics
+INFERENCE_QUEUE_DEPTH = Gauge('inference_queue_depth', 'Inference jobs waiting or running on the executor')
+INFERENCE_QUEUE_WAIT = Histogram('inference_queue_wait_seconds', 'Time an inference job waited for a worker')
+INFERENCE_RUN_TIME = Histogram('inference_run_seconds', 'Time spent running an inference job')
+INFERENCE_REJECTED = Counter('inference_rejected_total', 'Inference jobs rejected because the queue was full')
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference executor already holds INFERENCE_QUEUE_SIZE jobs"""
+
+
+def configure_torch_threads():
+    """Apply the configured torch thread pools; must run before the first forward pass"""
+    import torch
+
+    if INFERENCE_INTRA_OP_THREADS > 0:
+        torch.set_num_threads(INFERENCE_INTRA_OP_THREADS)
+    if INFERENCE_INTER_OP_THREADS > 0:
+        try:
+            torch.set_num_interop_threads(INFERENCE_INTER_OP_THREADS)
+        except RuntimeError as e:
+            # Torch only allows this before any inter-op parallel work has started
+            print(f"Warning: Could not set inter-op threads ({e})")
+
+
+class InferenceExecutor:
+    """
+    Runs CPU-bound model calls on dedicated worker threads so the asyncio event
+    loop keeps serving other requests (e.g. /ingest) during a forward pass.
+    The queue is bounded: once full, `run` fails fast with InferenceQueueFull.
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, max_queue: int = INFERENCE_QUEUE_SIZE):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="inference")
+        self.max_queue = max(1, max_queue)
+        self._depth = 0   # Only touched from the event loop thread
+
+    async def run(self, fn: Callable, *args):
+        if self._depth >= self.max_queue:
+            INFERENCE_REJECTED.inc()
+            raise InferenceQueueFull(f"Inference queue is full ({self.max_queue} jobs)")
+
+        self._depth += 1
+        INFERENCE_QUEUE_DEPTH.set(self._depth)
+        submitted_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            INFERENCE_QUEUE_WAIT.observe(started_at - submitted_at)
+            try:
+                return fn(*args)
+            finally:
+                INFERENCE_RUN_TIME.observe(time.perf_counter() - started_at)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, job)
+        finally:
+            self._depth -= 1
+            INFERENCE_QUEUE_DEPTH.set(self._depth)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,474 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo.errors import BulkWriteError
+
+from dedup import IN_FLIGHT, INDEX_DUPLICATES, TELEMETRY_DEDUP, DedupFilter, dedup_key, is_dedup_index_error
+from spool import Spool
+from telemetry_codec import decoder_for_topic
+
+# Configuration
+INGESTOR_WORKERS = int(os.getenv("INGESTOR_WORKERS", 2))
+INGESTOR_MAX_QUEUE = int(os.getenv("INGESTOR_MAX_QUEUE", 10000))
+INGESTOR_BATCH_SIZE = int(os.getenv("INGESTOR_BATCH_SIZE", 500))
+INGESTOR_FLUSH_INTERVAL_MS = float(os.getenv("INGESTOR_FLUSH_INTERVAL_MS", 0))   # Wait for more once the queue drains
+INGESTOR_MAX_INFLIGHT_WRITES = int(os.getenv("INGESTOR_MAX_INFLIGHT_WRITES", 4))   # ingestor_async.py only
+RETRY_BACKOFF_MAX_SECONDS = 30
+DUPLICATE_KEY_ERROR = 11000
+
+# Prometheus Metrics
+INGESTOR_QUEUE_DEPTH = Gauge('ingestor_queue_depth', 'MQTT messages waiting for a worker')
+INGESTOR_BATCH_SIZE_HIST = Histogram(
+    'ingestor_batch_size', 'Documents written per insert_many',
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+)
+INGESTOR_WRITE_LATENCY = Histogram('ingestor_write_seconds', 'insert_many latency per batch')
+INGESTOR_WRITE_FAILURES = Counter('ingestor_write_failures_total', 'insert_many calls that failed and were retried')
+INGESTOR_MESSAGES = Counter(
+    'ingestor_messages_total', 'MQTT messages handled by the workers', ['result']   # written | invalid | rejected | duplicate | spooled
+)
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+# --- MQTT TELEMETRY (shared by ingestor.py and ingestor_async.py) ---
+
+def decode_binary(decoder, topic, payload):
+    """Decode struct/MessagePack telemetry into the same fields as the JSON payloads"""
+    # Topic format: aqi/sensor/{sensor_id}/telemetry/{bin|msgpack}
+    topic_parts = topic.split('/')
+    reading = decoder(payload, topic_parts[2] if len(topic_parts) >= 3 else None)
+    reading['aqi_calculated'] = reading.pop('aqi')
+    if 'uptime_seconds' in reading:
+        reading['uptime'] = reading.pop('uptime_seconds')
+    return reading
+
+
+def telemetry_document(topic: str, payload: bytes) -> dict:
+    """sensor_logs fields of one MQTT message: JSON, or struct/MessagePack by topic suffix"""
+    decoder = decoder_for_topic(topic)
+    if decoder is not None:
+        logger.debug("Received %d byte binary message on %s", len(payload), topic)
+        data = decode_binary(decoder, topic, payload)
+    else:
+        logger.debug("Received message on %s: %r", topic, payload)
+        data = json.loads(payload)
+        if not isinstance(data, dict):
+            raise ValueError("JSON telemetry must be an object")
+
+    # Determine sensor_id from topic if not in payload, or trust payload
+    # Topic format: aqi/sensor/{sensor_id}/telemetry
+    topic_parts = topic.split('/')
+    if 'sensor_id' not in data and len(topic_parts) >= 3:
+        data['sensor_id'] = topic_parts[2]
+
+    if TELEMETRY_DEDUP:
+        key = dedup_key(data, payload)
+        if key is not None:
+            data['dedup_key'] = key
+    return data
+
+
+def _rejected(error: BulkWriteError) -> Tuple[int, int]:
+    """
+    (rejected, duplicates) of a failed insert_many. Duplicate _ids are documents
+    of an earlier attempt and count as written; the dedup index refuses
+    readings that are already stored.
+    """
+    rejected = duplicates = 0
+    for write_error in error.details.get("writeErrors", []):
+        if write_error.get("code") != DUPLICATE_KEY_ERROR:
+            rejected += 1
+        elif is_dedup_index_error(write_error):
+            duplicates += 1
+    if rejected:
+        logger.error(f"{rejected} documents rejected by MongoDB")
+    return rejected, duplicates
+
+
+def _record_write(docs: List[dict], rejected: int, duplicates: int, seconds: float):
+    INGESTOR_WRITE_LATENCY.observe(seconds)
+    INGESTOR_BATCH_SIZE_HIST.observe(len(docs))
+    INGESTOR_MESSAGES.labels(result="written").inc(len(docs) - rejected - duplicates)
+    if rejected:
+        INGESTOR_MESSAGES.labels(result="rejected").inc(rejected)
+    if duplicates:
+        INGESTOR_MESSAGES.labels(result="duplicate").inc(duplicates)
+        INDEX_DUPLICATES.inc(duplicates)
+
+
+def _spooled(spool: Spool, docs: List[dict]) -> bool:
+    if not spool.append(docs):
+        return False
+    INGESTOR_MESSAGES.labels(result="spooled").inc(len(docs))
+    return True
+
+
+class _AckSequencer:
+    """
+    Acknowledges messages in the order they were queued, whichever worker
+    commits them first: MQTT expects PUBACKs in receive order, and a broker only
+    frees a slot of its inflight window for the oldest unacknowledged message.
+    """
+
+    def __init__(self, ack: Callable[[object], None]):
+        self.ack = ack
+        self._lock = threading.Lock()
+        self._seq = {}       # id(message) -> queue position
+        self._ready = {}     # queue position -> message, committed but waiting for older ones
+        self._next_seq = 0
+        self._next_ack = 0
+
+    def track(self, message):
+        with self._lock:
+            self._seq[id(message)] = self._next_seq
+            self._next_seq += 1
+
+    def release(self, messages: List[object]):
+        """Mark messages ready and acknowledge every one with no older message still pending"""
+        with self._lock:
+            for message in messages:
+                seq = self._seq.pop(id(message), None)
+                if seq is not None:
+                    self._ready[seq] = message
+            # Acked under the lock so concurrent workers cannot reorder them
+            while self._next_ack in self._ready:
+                message = self._ready.pop(self._next_ack)
+                self._next_ack += 1
+                try:
+                    self.ack(message)
+                except Exception as e:
+                    # Left for redelivery; must not hold back the acks behind it
+                    logger.error(f"Failed to acknowledge a message: {e}")
+
+
+def _decode_batch(decode, batch) -> Tuple[List[dict], List[object]]:
+    """(documents to write, messages to acknowledge once they are committed)"""
+    docs, acks = [], []
+    for message, received_at in batch:
+        try:
+            doc = decode(message, received_at)
+        except Exception as e:
+            # Redelivery would fail the same way, so it is acknowledged with the batch
+            logger.error(f"Dropping message on {getattr(message, 'topic', '?')}: {e}")
+            INGESTOR_MESSAGES.labels(result="invalid").inc()
+            acks.append(message)
+            continue
+        if doc is None or doc is IN_FLIGHT:
+            # Already stored: acknowledged without a write. A copy of a reading still
+            # being written is held by the dedup filter and acknowledged with it.
+            INGESTOR_MESSAGES.labels(result="duplicate").inc()
+            if doc is None:
+                acks.append(message)
+            continue
+        docs.append(doc)
+        acks.append(message)
+    return docs, acks
+
+
+def _settle_claims(dedup: Optional[DedupFilter], docs: List[dict], committed: bool) -> List[object]:
+    """Commit (or release) the dedup claims of a batch; returns the copies the filter held"""
+    if dedup is None:
+        return []
+    settle = dedup.commit if committed else dedup.release
+    held = []
+    for doc in docs:
+        held.extend(settle(doc.get('sensor_id', 'unknown'), doc.get('dedup_key')))
+    return held
+
+
+class IngestPipeline:
+    """
+    Decouples the MQTT network thread from MongoDB. `put` only queues the
+    message; worker threads decode queued messages with `decode(message,
+    received_at) -> doc`, write them with `writer(docs)` (an unordered
+    insert_many) and call `ack(message)` only once the batch is committed. A
+    batch takes whatever is queued, up to `batch_size`, and is written as soon
+    as the queue drains (after waiting up to `flush_interval_ms` for more):
+    unacknowledged messages count against the broker's QoS1 inflight window,
+    so waiting for a fuller batch would only stall delivery. Acks go out in
+    the order messages were queued, across workers. A failed write is
+    retried with backoff, so unwritten messages are never acknowledged.
+    `decode` returns None for a duplicate, which is acknowledged unwritten, or
+    IN_FLIGHT for a copy of a reading another batch is writing: the `dedup`
+    filter holds it, and it is acknowledged when that batch commits (the
+    claims of a batch are only committed once it is written or spooled).
+
+    With a `spool`, a failed batch is appended to it and acknowledged instead,
+    and while the spool holds a backlog new batches go straight behind it, so
+    a MongoDB outage neither loses readings nor stalls the MQTT loop. Retries
+    only resume once the spool is full.
+    """
+
+    def __init__(self, decode: Callable[[object, datetime], Optional[dict]], writer: Callable[[List[dict]], object],
+                 ack: Callable[[object], None], workers: int = INGESTOR_WORKERS, max_queue: int = INGESTOR_MAX_QUEUE,
+                 batch_size: int = INGESTOR_BATCH_SIZE, flush_interval_ms: float = INGESTOR_FLUSH_INTERVAL_MS,
+                 spool: Optional[Spool] = None, dedup: Optional[DedupFilter] = None):
+        self.decode = decode
+        self.writer = writer
+        self.ack = ack
+        self.spool = spool
+        self.dedup = dedup
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000.0
+        self._acks = _AckSequencer(ack)
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_queue))
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        INGESTOR_QUEUE_DEPTH.set_function(self._queue.qsize)
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, message):
+        """
+        Queue a message from the MQTT callback. Blocks while the queue is full,
+        which pushes back on the broker instead of buffering without bound.
+        """
+        if self._stopping.is_set():
+            # Not acknowledged, so the broker redelivers it to the next session
+            return
+        self._acks.track(message)
+        self._queue.put((message, datetime.utcnow()))
+
+    def stop(self, timeout: Optional[float] = None):
+        """Write and acknowledge everything already queued, then stop the workers"""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                try:
+                    self._process(batch)
+                except Exception as e:
+                    logger.error(f"Ingest worker failed on a batch of {len(batch)} messages: {e}")
+            if stop:
+                return
+
+    def _next_batch(self):
+        """Block for one message, then take what is queued until the batch is full or the queue drains"""
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _process(self, batch):
+        docs, acks = _decode_batch(self.decode, batch)
+        if docs and not self._write(docs):
+            # Unacknowledged, so the broker redelivers them (and the copies held meanwhile)
+            _settle_claims(self.dedup, docs, committed=False)
+            return
+        self._acks.release(acks + _settle_claims(self.dedup, docs, committed=True))
+
+    def _write(self, docs: List[dict]) -> bool:
+        """insert_many (or the spool) with retries; False only if it still failed when shutdown began"""
+        if self.spool is not None and len(self.spool) and _spooled(self.spool, docs):
+            return True
+        backoff = 0.5
+        while True:
+            start = time.perf_counter()
+            try:
+                # pymongo sets _id on the documents on the first attempt, so a retry
+                # after an ambiguous failure cannot insert a reading twice
+                self.writer(docs)
+                rejected = duplicates = 0
+            except BulkWriteError as e:
+                rejected, duplicates = _rejected(e)
+            except Exception as e:
+                INGESTOR_WRITE_FAILURES.inc()
+                if self.spool is not None and _spooled(self.spool, docs):
+                    logger.warning(f"insert_many of {len(docs)} documents failed ({e}), spooled them for replay")
+                    return True
+                if self._stopping.is_set():
+                    logger.error(f"insert_many failed during shutdown ({e}); {len(docs)} messages left unacknowledged")
+                    return False
+                logger.error(f"insert_many of {len(docs)} documents failed ({e}), retrying in {backoff:.1f}s")
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX_SECONDS)
+                continue
+
+            _record_write(docs, rejected, duplicates, time.perf_counter() - start)
+            return True
+
+
+class AsyncIngestPipeline:
+    """
+    asyncio counterpart of IngestPipeline for ingestor_async.py. One collector
+    task batches queued messages the same way, and up to `max_inflight_writes`
+    batches are written concurrently through an async `writer` (motor), so the
+    MQTT connection keeps reading while writes are in flight. Messages are still
+    acknowledged only after their batch is committed (to MongoDB or the `spool`,
+    which is written from the default executor), in the order they were queued.
+    """
+
+    def __init__(self, decode: Callable[[object, datetime], Optional[dict]], writer: Callable[[List[dict]], Awaitable],
+                 ack: Callable[[object], None], max_inflight_writes: int = INGESTOR_MAX_INFLIGHT_WRITES,
+                 max_queue: int = INGESTOR_MAX_QUEUE, batch_size: int = INGESTOR_BATCH_SIZE,
+                 flush_interval_ms: float = INGESTOR_FLUSH_INTERVAL_MS, spool: Optional[Spool] = None,
+                 dedup: Optional[DedupFilter] = None):
+        self.decode = decode
+        self.writer = writer
+        self.ack = ack
+        self.spool = spool
+        self.dedup = dedup
+        self.max_inflight_writes = max(1, max_inflight_writes)
+        self.max_queue = max(1, max_queue)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000.0
+        self._acks = _AckSequencer(ack)
+
+        # Created in start() so they bind to the running loop
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._collector = None
+        self._writes: Set[asyncio.Task] = set()
+        self._stopping = False
+
+    def __len__(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        if self._collector is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._slots = asyncio.Semaphore(self.max_inflight_writes)
+            self._collector = asyncio.create_task(self._run())
+            INGESTOR_QUEUE_DEPTH.set_function(self._queue.qsize)
+
+    async def put(self, message):
+        """Queue a message; waits while the queue is full, which pauses reading from the broker"""
+        if self._stopping:
+            return
+        self._acks.track(message)
+        await self._queue.put((message, datetime.utcnow()))
+
+    async def stop(self):
+        """Write and acknowledge everything already queued, then stop"""
+        if self._collector is None or self._stopping:
+            return
+        self._stopping = True
+        await self._queue.put(_STOP)
+        await self._collector
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            batch, stop = await self._next_batch()
+            if batch:
+                await self._slots.acquire()
+                task = asyncio.create_task(self._process(batch))
+                self._writes.add(task)
+                task.add_done_callback(self._write_done)
+            if stop:
+                return
+
+    def _write_done(self, task: asyncio.Task):
+        self._writes.discard(task)
+        self._slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Ingest write task failed: {task.exception()}")
+
+    async def _next_batch(self):
+        """Wait for one message, then take what is queued until the batch is full or the queue drains"""
+        item = await self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                # Take what is already queued without scheduling a timeout per message
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _process(self, batch):
+        docs, acks = _decode_batch(self.decode, batch)
+        if docs and not await self._write(docs):
+            # Unacknowledged, so the broker redelivers them (and the copies held meanwhile)
+            _settle_claims(self.dedup, docs, committed=False)
+            return
+        self._acks.release(acks + _settle_claims(self.dedup, docs, committed=True))
+
+    async def _spool(self, docs: List[dict]) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(None, _spooled, self.spool, docs)
+
+    async def _write(self, docs: List[dict]) -> bool:
+        """insert_many (or the spool) with retries; False only if it still failed when shutdown began"""
+        if self.spool is not None and len(self.spool) and await self._spool(docs):
+            return True
+        backoff = 0.5
+        while True:
+            start = time.perf_counter()
+            try:
+                await self.writer(docs)
+                rejected = duplicates = 0
+            except BulkWriteError as e:
+                rejected, duplicates = _rejected(e)
+            except Exception as e:
+                INGESTOR_WRITE_FAILURES.inc()
+                if self.spool is not None and await self._spool(docs):
+                    logger.warning(f"insert_many of {len(docs)} documents failed ({e}), spooled them for replay")
+                    return True
+                if self._stopping:
+                    logger.error(f"insert_many failed during shutdown ({e}); {len(docs)} messages left unacknowledged")
+                    return False
+                logger.error(f"insert_many of {len(docs)} documents failed ({e}), retrying in {backoff:.1f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX_SECONDS)
+                continue
+
+            _record_write(docs, rejected, duplicates, time.perf_counter() - start)
+            return True
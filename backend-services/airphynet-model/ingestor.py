@@ -1,13 +1,16 @@
 import os
-import json
 import logging
+import signal
 import ssl
 import threading
-from datetime import datetime
 import paho.mqtt.client as mqtt
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from prometheus_client import start_http_server, Gauge, Counter
+from prometheus_client import start_http_server, Counter
+from dedup import CLAIMED, DEDUP_INDEX_KEYS, DEDUP_INDEX_OPTIONS, IN_FLIGHT, TELEMETRY_DEDUP, DedupFilter
+from ingest_pipeline import IngestPipeline, telemetry_document
+from sensor_metrics import SensorMetrics
+from spool import INGEST_SPOOL, INGEST_SPOOL_DIR, Spool, SpoolReplayer
 
 # Load environment variables
 load_dotenv()
@@ -18,6 +21,16 @@ MQTT_PORT = int(os.getenv("MQTT_PORT", 8883))
 MQTT_TOPIC = os.getenv("MQTT_TOPIC", "aqi/sensor/+/telemetry")
 MQTT_USERNAME = os.getenv("MQTT_USERNAME", "")
 MQTT_PASSWORD = os.getenv("MQTT_PASSWORD", "")
+# Also subscribe to <MQTT_TOPIC>/bin (struct) and <MQTT_TOPIC>/msgpack binary telemetry
+MQTT_BINARY_TELEMETRY = os.getenv("MQTT_BINARY_TELEMETRY", "true").lower() == "true"
+# QoS1 messages are acknowledged only after they are written to MongoDB
+MQTT_QOS = int(os.getenv("MQTT_QOS", 1))
+# A fixed client id keeps a persistent session, so unacknowledged messages are redelivered after a restart
+MQTT_CLIENT_ID = os.getenv("MQTT_CLIENT_ID", "")
+# Ingestors in the same MQTT shared subscription group ($share/<group>/...) split the telemetry between them
+# (ingestor_supervisor.py runs several, or run one per replica with the same group)
+MQTT_SHARE_GROUP = os.getenv("MQTT_SHARE_GROUP", "")
+METRICS_PORT = int(os.getenv("INGESTOR_METRICS_PORT", 8001))
 
 MONGODB_URI = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("DB_NAME", "aqi_monitoring")
@@ -27,20 +40,19 @@ COLLECTION_NAME = os.getenv("COLLECTION_NAME", "sensor_logs")
 if not MONGODB_URI:
     raise ValueError("MONGODB_URI environment variable is not set")
 
-# Setup Logging
-logging.basicConfig(level=logging.DEBUG)
-logging.getLogger("paho").setLevel(logging.DEBUG) # Force Paho Debug
+# Setup Logging (LOG_LEVEL=DEBUG logs every message and MQTT packet)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=LOG_LEVEL)
+logging.getLogger("paho").setLevel(LOG_LEVEL)
 logger = logging.getLogger(__name__)
-print("DEBUG: Logger initialized at DEBUG level")
+logger.info(f"Logger initialized at {LOG_LEVEL} level")
 
 # Prometheus Metrics
-SENSOR_TEMP = Gauge('sensor_temperature_celsius', 'Temperature from sensor', ['sensor_id'])
-SENSOR_HUM = Gauge('sensor_humidity_percent', 'Humidity from sensor', ['sensor_id'])
-SENSOR_CO2 = Gauge('sensor_co2_ppm', 'CO2 PPM from sensor', ['sensor_id'])
-SENSOR_AQI = Gauge('sensor_aqi', 'Calculated AQI from sensor', ['sensor_id'])
-SENSOR_RSSI = Gauge('sensor_rssi_dbm', 'WiFi Signal Strength (dBm)', ['sensor_id'])
-SENSOR_UPTIME = Gauge('sensor_uptime_seconds', 'Sensor Uptime in seconds', ['sensor_id'])
 MSG_COUNTER = Counter('sensor_messages_total', 'Total MQTT messages received', ['sensor_id'])
+# Per-sensor gauges (and MSG_COUNTER) with TTL eviction and a cardinality cap, plus fleet histograms
+sensor_series = SensorMetrics(counters=(MSG_COUNTER,))
+# Recently seen (sensor_id, dedup_key) pairs: drops QoS1 redeliveries and re-forwarded copies
+dedup_filter = DedupFilter() if TELEMETRY_DEDUP else None
 
 # MongoDB Connection
 try:
@@ -52,59 +64,81 @@ except Exception as e:
     logger.error(f"Failed to connect to MongoDB: {e}")
     exit(1)
 
-def on_connect(client, userdata, flags, rc):
-    if rc == 0:
+if TELEMETRY_DEDUP:
+    # Backstop for duplicates the in-memory filter misses; fails if sensor_logs already holds some
+    try:
+        collection.create_index(DEDUP_INDEX_KEYS, **DEDUP_INDEX_OPTIONS)
+    except Exception as e:
+        logger.error(f"Failed to create the dedup index: {e}")
+
+# JSON telemetry, plus <MQTT_TOPIC>/bin and <MQTT_TOPIC>/msgpack binary telemetry
+TOPICS = [MQTT_TOPIC] + ([f"{MQTT_TOPIC}/+"] if MQTT_BINARY_TELEMETRY else [])
+if MQTT_SHARE_GROUP:
+    # Messages still arrive on the plain topic, so sensor_id/format parsing is unchanged
+    TOPICS = [f"$share/{MQTT_SHARE_GROUP}/{topic}" for topic in TOPICS]
+
+def on_connect(client, userdata, flags, reason_code, properties):
+    if not reason_code.is_failure:
         logger.info("Connected to MQTT Broker")
-        client.subscribe(MQTT_TOPIC)
-        logger.info(f"Subscribed to topic: {MQTT_TOPIC}")
+        client.subscribe([(topic, MQTT_QOS) for topic in TOPICS])
+        logger.info(f"Subscribed to topics: {', '.join(TOPICS)} (QoS {MQTT_QOS})")
     else:
-        logger.error(f"Failed to connect, return code {rc}")
+        logger.error(f"Failed to connect: {reason_code}")
+
+def message_to_doc(msg, received_at):
+    """
+    Decode one MQTT message into its sensor_logs document (runs on an ingest worker):
+    None for a duplicate, IN_FLIGHT for a copy of a reading that is still being written
+    """
+    data = telemetry_document(msg.topic, msg.payload)
+    sid = data.get('sensor_id', 'unknown')
+    if dedup_filter is not None:
+        claim = dedup_filter.claim(sid, data.get('dedup_key'), msg)
+        if claim != CLAIMED:
+            logger.debug(f"Duplicate message on {msg.topic} ({data['dedup_key']})")
+            # A copy of a reading still being written is held until that write commits
+            return IN_FLIGHT if claim == IN_FLIGHT else None
+    
+    # Update Metrics
+    sensor_series.observe(
+        sid,
+        temperature=data.get('temperature'), humidity=data.get('humidity'), co2_ppm=data.get('co2_ppm'),
+        aqi=data.get('aqi_calculated'), rssi=data.get('rssi'), uptime=data.get('uptime')
+    )
+
+    # Add server-side timestamps (time of arrival, not of the write)
+    data['received_at'] = received_at
+    return data
+
+def ack_message(msg):
+    # No-op for QoS 0 messages
+    client.ack(msg.mid, msg.qos)
+
+def write_docs(docs):
+    collection.insert_many(docs, ordered=False)
+
+# Batches MongoDB cannot take are spooled to local disk and replayed once it is back
+# (one file per metrics port, so every supervised worker has its own)
+spool = Spool(os.path.join(INGEST_SPOOL_DIR, f"ingestor-{METRICS_PORT}.db")) if INGEST_SPOOL else None
+replayer = SpoolReplayer(spool, write_docs) if spool is not None else None
+
+# Batched writes off the network thread (INGESTOR_WORKERS, INGESTOR_BATCH_SIZE, INGESTOR_FLUSH_INTERVAL_MS)
+pipeline = IngestPipeline(message_to_doc, write_docs, ack_message, spool=spool, dedup=dedup_filter)
 
 def on_message(client, userdata, msg):
-    try:
-        payload_str = msg.payload.decode('utf-8')
-        logger.info(f"Received message on {msg.topic}: {payload_str}")
-        
-        data = json.loads(payload_str)
-        
-        # Determine sensor_id from topic if not in payload, or trust payload
-        # Topic format: aqi/sensor/{sensor_id}/telemetry
-        topic_parts = msg.topic.split('/')
-        if 'sensor_id' not in data and len(topic_parts) >= 3:
-            data['sensor_id'] = topic_parts[2]
-
-        sid = data.get('sensor_id', 'unknown')
-        
-        # Update Metrics
-        MSG_COUNTER.labels(sensor_id=sid).inc()
-        if 'temperature' in data: SENSOR_TEMP.labels(sensor_id=sid).set(data['temperature'])
-        if 'humidity' in data: SENSOR_HUM.labels(sensor_id=sid).set(data['humidity'])
-        if 'co2_ppm' in data: SENSOR_CO2.labels(sensor_id=sid).set(data['co2_ppm'])
-        if 'aqi_calculated' in data: SENSOR_AQI.labels(sensor_id=sid).set(data['aqi_calculated'])
-        if 'rssi' in data: SENSOR_RSSI.labels(sensor_id=sid).set(data['rssi'])
-        if 'uptime' in data: SENSOR_UPTIME.labels(sensor_id=sid).set(data['uptime'])
-
-        # Add server-side timestamps
-        data['received_at'] = datetime.utcnow()
-        if 'timestamp' in data:
-            # Convert unix timestamp to datetime if needed, or keep as is
-            pass
-            
-        # Insert into MongoDB
-        result = collection.insert_one(data)
-        logger.info(f"Inserted document with ID: {result.inserted_id}")
-        
-    except json.JSONDecodeError:
-        logger.error("Failed to decode JSON payload")
-    except Exception as e:
-        logger.error(f"Error processing message: {e}")
+    # Runs on paho's network thread: only hand the message over
+    pipeline.put(msg)
 
 MQTT_TRANSPORT = os.getenv("MQTT_TRANSPORT", "tcp")
 
 # ...
 
 # MQTT Setup
-client = mqtt.Client(transport=MQTT_TRANSPORT)
+# Manual acks: QoS1 messages are acknowledged by the ingest workers after the insert
+client = mqtt.Client(
+    mqtt.CallbackAPIVersion.VERSION2, client_id=MQTT_CLIENT_ID, clean_session=not MQTT_CLIENT_ID,
+    transport=MQTT_TRANSPORT, manual_ack=True
+)
 client.enable_logger(logger) # ENABLE DEEP LOGGING
 if MQTT_TRANSPORT == "websockets":
     client.ws_set_options(path="/mqtt")
@@ -128,13 +162,40 @@ logger.info(f"Connecting to MQTT Broker: {MQTT_BROKER}:{MQTT_PORT}...")
 
 # Start Prometheus Client Server
 try:
-    start_http_server(8001)
-    logger.info("Prometheus metrics server started on port 8001")
+    start_http_server(METRICS_PORT)
+    logger.info(f"Prometheus metrics server started on port {METRICS_PORT}")
 except Exception as e:
     logger.error(f"Failed to start Prometheus server: {e}")
 
+def drain_and_disconnect():
+    # Stop new deliveries, write and acknowledge what is queued, then leave
+    client.unsubscribe(TOPICS)
+    pipeline.stop()
+    if replayer is not None:
+        replayer.stop()
+    client.disconnect()
+
+shutdown_requested = threading.Event()
+
+def on_shutdown_signal(signum, frame):
+    # The supervisor and the terminal may both signal; drain only once
+    if shutdown_requested.is_set():
+        return
+    shutdown_requested.set()
+    logger.info("Shutdown requested, draining the ingest queue")
+    # The MQTT loop must keep running to send the acks, so drain from another thread
+    threading.Thread(target=drain_and_disconnect, daemon=True).start()
+
+signal.signal(signal.SIGTERM, on_shutdown_signal)
+signal.signal(signal.SIGINT, on_shutdown_signal)
+
+pipeline.start()
+if replayer is not None:
+    replayer.start()
 try:
     client.connect(MQTT_BROKER, MQTT_PORT, 60)
     client.loop_forever()
 except Exception as e:
     logger.error(f"MQTT Connection Error: {e}")
+finally:
+    pipeline.stop()
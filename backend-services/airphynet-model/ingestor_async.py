@@ -0,0 +1,207 @@
+"""
+asyncio version of ingestor.py: aiomqtt for MQTT and motor for MongoDB on one
+event loop, so reading from the broker and up to INGESTOR_MAX_INFLIGHT_WRITES
+insert_many calls overlap instead of sharing threads. Configuration, topics,
+TLS/WebSocket handling, acknowledgements and metrics are the same as ingestor.py,
+and ingestor_supervisor.py runs it with INGESTOR_ASYNC=true:
+
+    python ingestor_async.py
+"""
+import asyncio
+import logging
+import os
+import signal
+import ssl
+from typing import NamedTuple
+
+import aiomqtt
+import paho.mqtt.client as mqtt
+from dotenv import load_dotenv
+from prometheus_client import start_http_server, Counter
+
+from dedup import CLAIMED, DEDUP_INDEX_KEYS, DEDUP_INDEX_OPTIONS, IN_FLIGHT, TELEMETRY_DEDUP, DedupFilter
+from ingest_pipeline import AsyncIngestPipeline, telemetry_document
+from mongo import create_async_client
+from sensor_metrics import SensorMetrics
+from spool import INGEST_SPOOL, INGEST_SPOOL_DIR, AsyncSpoolReplayer, Spool
+
+# Load environment variables
+load_dotenv()
+
+# Configuration (same variables as ingestor.py)
+MQTT_BROKER = os.getenv("MQTT_BROKER", "broker.emqx.io")
+MQTT_PORT = int(os.getenv("MQTT_PORT", 8883))
+MQTT_TOPIC = os.getenv("MQTT_TOPIC", "aqi/sensor/+/telemetry")
+MQTT_USERNAME = os.getenv("MQTT_USERNAME", "")
+MQTT_PASSWORD = os.getenv("MQTT_PASSWORD", "")
+MQTT_TRANSPORT = os.getenv("MQTT_TRANSPORT", "tcp")
+MQTT_BINARY_TELEMETRY = os.getenv("MQTT_BINARY_TELEMETRY", "true").lower() == "true"
+MQTT_QOS = int(os.getenv("MQTT_QOS", 1))
+MQTT_CLIENT_ID = os.getenv("MQTT_CLIENT_ID", "")
+MQTT_SHARE_GROUP = os.getenv("MQTT_SHARE_GROUP", "")
+METRICS_PORT = int(os.getenv("INGESTOR_METRICS_PORT", 8001))
+RECONNECT_DELAY_SECONDS = 5
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+DB_NAME = os.getenv("DB_NAME", "aqi_monitoring")
+COLLECTION_NAME = os.getenv("COLLECTION_NAME", "sensor_logs")
+
+# Validations
+if not MONGODB_URI:
+    raise ValueError("MONGODB_URI environment variable is not set")
+
+# Setup Logging (LOG_LEVEL=DEBUG logs every message and MQTT packet)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=LOG_LEVEL)
+logger = logging.getLogger("ingestor_async")
+
+# Prometheus Metrics
+MSG_COUNTER = Counter('sensor_messages_total', 'Total MQTT messages received', ['sensor_id'])
+sensor_series = SensorMetrics(counters=(MSG_COUNTER,))
+dedup_filter = DedupFilter() if TELEMETRY_DEDUP else None
+
+# JSON telemetry, plus <MQTT_TOPIC>/bin and <MQTT_TOPIC>/msgpack binary telemetry
+TOPICS = [MQTT_TOPIC] + ([f"{MQTT_TOPIC}/+"] if MQTT_BINARY_TELEMETRY else [])
+if MQTT_SHARE_GROUP:
+    TOPICS = [f"$share/{MQTT_SHARE_GROUP}/{topic}" for topic in TOPICS]
+
+
+class Delivery(NamedTuple):
+    """One received message and the connection that must acknowledge it"""
+    topic: str
+    payload: bytes
+    mid: int
+    qos: int
+    client: aiomqtt.Client
+
+
+def tls_context():
+    # Same context as ingestor.py / test_wss.py for the TLS ports (8883 MQTT, 8084 WebSocket)
+    if MQTT_PORT not in [8883, 8084]:
+        return None
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def message_to_doc(delivery: Delivery, received_at):
+    """sensor_logs document of one MQTT message; None for a duplicate, IN_FLIGHT while another copy is being written"""
+    data = telemetry_document(delivery.topic, delivery.payload)
+    sid = data.get('sensor_id', 'unknown')
+    if dedup_filter is not None:
+        claim = dedup_filter.claim(sid, data.get('dedup_key'), delivery)
+        if claim != CLAIMED:
+            logger.debug(f"Duplicate message on {delivery.topic} ({data['dedup_key']})")
+            # A copy of a reading still being written is held until that write commits
+            return IN_FLIGHT if claim == IN_FLIGHT else None
+    sensor_series.observe(
+        sid,
+        temperature=data.get('temperature'), humidity=data.get('humidity'), co2_ppm=data.get('co2_ppm'),
+        aqi=data.get('aqi_calculated'), rssi=data.get('rssi'), uptime=data.get('uptime')
+    )
+    data['received_at'] = received_at
+    return data
+
+
+def ack_message(delivery: Delivery):
+    # aiomqtt has no ack API; go through its paho client (manual acks are enabled before connecting).
+    # Message ids belong to one connection, so a delivery is acked on the client that received it.
+    delivery.client._client.ack(delivery.mid, delivery.qos)
+
+
+def create_mqtt_client() -> aiomqtt.Client:
+    client = aiomqtt.Client(
+        MQTT_BROKER, MQTT_PORT,
+        username=MQTT_USERNAME or None, password=MQTT_PASSWORD or None,
+        identifier=MQTT_CLIENT_ID or None, clean_session=not MQTT_CLIENT_ID,
+        transport=MQTT_TRANSPORT, websocket_path="/mqtt" if MQTT_TRANSPORT == "websockets" else None,
+        tls_context=tls_context(), keepalive=60, logger=logger
+    )
+    paho_client = getattr(client, "_client", None)
+    if not isinstance(paho_client, mqtt.Client):
+        # Without it messages could not be acked and QoS 1 would be redelivered forever
+        raise RuntimeError(f"aiomqtt {getattr(aiomqtt, '__version__', '?')} has no paho client at Client._client; "
+                           "install the version pinned in requirements.txt")
+    paho_client.manual_ack_set(True)
+    return client
+
+
+async def read_messages(client: aiomqtt.Client, pipeline: AsyncIngestPipeline):
+    async for message in client.messages:
+        await pipeline.put(Delivery(str(message.topic), message.payload, message.mid, message.qos, client))
+
+
+async def consume(pipeline: AsyncIngestPipeline, stop: asyncio.Event):
+    """Read from the broker until `stop` is set, reconnecting after connection errors"""
+    while not stop.is_set():
+        try:
+            logger.info(f"Connecting to MQTT Broker: {MQTT_BROKER}:{MQTT_PORT}...")
+            async with create_mqtt_client() as client:
+                logger.info("Connected to MQTT Broker")
+                await client.subscribe([(topic, MQTT_QOS) for topic in TOPICS])
+                logger.info(f"Subscribed to topics: {', '.join(TOPICS)} (QoS {MQTT_QOS})")
+
+                reader = asyncio.create_task(read_messages(client, pipeline))
+                stopped = asyncio.create_task(stop.wait())
+                await asyncio.wait({reader, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                if stop.is_set():
+                    reader.cancel()
+                    # Stop new deliveries, then write and acknowledge what is queued on this connection
+                    await client.unsubscribe(TOPICS)
+                    await pipeline.stop()
+                    return
+                stopped.cancel()
+                reader.result()   # Raises the MqttError that ended the connection
+        except aiomqtt.MqttError as e:
+            logger.error(f"MQTT Connection Error: {e}. Reconnecting in {RECONNECT_DELAY_SECONDS}s")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=RECONNECT_DELAY_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def main():
+    mongo_client = create_async_client(MONGODB_URI)
+    collection = mongo_client[DB_NAME][COLLECTION_NAME]
+    if TELEMETRY_DEDUP:
+        # Backstop for duplicates the in-memory filter misses; fails if sensor_logs already holds some
+        try:
+            await collection.create_index(DEDUP_INDEX_KEYS, **DEDUP_INDEX_OPTIONS)
+        except Exception as e:
+            logger.error(f"Failed to create the dedup index: {e}")
+
+    def write_docs(docs):
+        return collection.insert_many(docs, ordered=False)
+
+    # Batches MongoDB cannot take are spooled to local disk and replayed once it is back
+    spool = Spool(os.path.join(INGEST_SPOOL_DIR, f"ingestor-{METRICS_PORT}.db")) if INGEST_SPOOL else None
+    replayer = AsyncSpoolReplayer(spool, write_docs) if spool is not None else None
+
+    # Batched writes, up to INGESTOR_MAX_INFLIGHT_WRITES insert_many calls at once
+    pipeline = AsyncIngestPipeline(message_to_doc, write_docs, ack_message, spool=spool, dedup=dedup_filter)
+    pipeline.start()
+    if replayer is not None:
+        replayer.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    # Start Prometheus Client Server
+    try:
+        start_http_server(METRICS_PORT)
+        logger.info(f"Prometheus metrics server started on port {METRICS_PORT}")
+    except Exception as e:
+        logger.error(f"Failed to start Prometheus server: {e}")
+
+    await consume(pipeline, stop)
+    await pipeline.stop()
+    if replayer is not None:
+        await replayer.stop()
+    logger.info("Ingestor stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+Runs several ingestor.py processes as one MQTT shared subscription group, so the
+broker load-balances telemetry across them instead of one process taking it all:
+
+    INGESTOR_PROCESSES=4 python ingestor_supervisor.py
+
+Worker i serves its metrics on INGESTOR_METRICS_PORT + i and, when MQTT_CLIENT_ID
+is set, connects as <MQTT_CLIENT_ID>-i. SIGTERM/SIGINT is forwarded to every
+worker; each drains and acknowledges its queue before exiting. A worker that
+exits on its own is restarted. INGESTOR_ASYNC=true runs ingestor_async.py
+workers instead.
+"""
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+INGESTOR_PROCESSES = int(os.getenv("INGESTOR_PROCESSES", 2))
+MQTT_SHARE_GROUP = os.getenv("MQTT_SHARE_GROUP") or "airphynet-ingestors"
+INGESTOR_METRICS_PORT = int(os.getenv("INGESTOR_METRICS_PORT", 8001))
+MQTT_CLIENT_ID = os.getenv("MQTT_CLIENT_ID", "")
+INGESTOR_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("INGESTOR_SHUTDOWN_TIMEOUT_SECONDS", 30))
+INGESTOR_ASYNC = os.getenv("INGESTOR_ASYNC", "false").lower() == "true"
+RESTART_DELAY_SECONDS = 2
+INGESTOR_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "ingestor_async.py" if INGESTOR_ASYNC else "ingestor.py"
+)
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger("ingestor_supervisor")
+
+
+def worker_env(index: int) -> dict:
+    env = dict(
+        os.environ,
+        MQTT_SHARE_GROUP=MQTT_SHARE_GROUP,
+        INGESTOR_METRICS_PORT=str(INGESTOR_METRICS_PORT + index),
+    )
+    if MQTT_CLIENT_ID:
+        # Every session in the group needs its own id
+        env["MQTT_CLIENT_ID"] = f"{MQTT_CLIENT_ID}-{index}"
+    return env
+
+
+class Supervisor:
+    def __init__(self, processes: int = INGESTOR_PROCESSES):
+        self.processes = max(1, processes)
+        self.workers: Dict[int, subprocess.Popen] = {}
+        self.stopping = False
+
+    def spawn(self, index: int):
+        self.workers[index] = subprocess.Popen([sys.executable, INGESTOR_SCRIPT], env=worker_env(index))
+        logger.info(
+            f"Started ingestor {index} (pid {self.workers[index].pid}, metrics port {INGESTOR_METRICS_PORT + index})"
+        )
+
+    def run(self):
+        logger.info(f"Running {self.processes} ingestors in shared subscription group '{MQTT_SHARE_GROUP}'")
+        for index in range(self.processes):
+            self.spawn(index)
+
+        while not self.stopping:
+            time.sleep(0.5)
+            for index, worker in list(self.workers.items()):
+                if worker.poll() is not None and not self.stopping:
+                    logger.error(f"Ingestor {index} exited with code {worker.returncode}, restarting")
+                    time.sleep(RESTART_DELAY_SECONDS)
+                    if not self.stopping:
+                        self.spawn(index)
+        self.wait_for_workers()
+
+    def stop(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info(f"Stopping {len(self.workers)} ingestors")
+        for worker in self.workers.values():
+            if worker.poll() is None:
+                worker.send_signal(signal.SIGTERM)
+
+    def wait_for_workers(self):
+        """Give every worker the shutdown timeout to drain, then kill what is left"""
+        deadline = time.monotonic() + INGESTOR_SHUTDOWN_TIMEOUT_SECONDS
+        for index, worker in self.workers.items():
+            try:
+                worker.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.error(f"Ingestor {index} did not drain within {INGESTOR_SHUTDOWN_TIMEOUT_SECONDS}s, killing it")
+                worker.kill()
+                worker.wait()
+        logger.info("All ingestors stopped")
+
+
+if __name__ == "__main__":
+    supervisor = Supervisor()
+    signal.signal(signal.SIGTERM, supervisor.stop)
+    signal.signal(signal.SIGINT, supervisor.stop)
+    supervisor.run()
@@ -1,6 +1,23 @@
+import threading
 import torch
 import torch.nn as nn
 import numpy as np
+from typing import Optional, Tuple
+
+# Number of future steps emitted by the multi-horizon output head
+FORECAST_HORIZON = 6
+
+# Approx stats (Temp, Hum, CO2, AQI)
+# Based on typical sensor ranges:
+# Temp: 20-40 -> Mean 30, Std 10
+# Hum: 40-80 -> Mean 60, Std 20
+# CO2: 400-2000 -> Mean 1000, Std 500
+# AQI: 0-300 -> Mean 100, Std 50
+# Built once as float32 so normalization never round-trips through float64
+FEATURE_MEANS = np.array([30.0, 60.0, 1000.0, 100.0], dtype=np.float32)
+FEATURE_STDS = np.array([10.0, 20.0, 500.0, 50.0], dtype=np.float32)
+FEATURE_SCALE = (1.0 / (FEATURE_STDS + 1e-8)).astype(np.float32)
+NUM_FEATURES = len(FEATURE_MEANS)
 
 class AirPhyNet(nn.Module):
     def __init__(self, input_size=4, hidden_size=64, num_layers=2, output_size=1, dropout_prob=0.2):
@@ -53,63 +70,138 @@ class AirPhyNet(nn.Module):
         
         return torch.mean(residual ** 2)
     
-    def forward(self, x):
-        # Initialize hidden state
-        h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size)
-        c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size)
-        
-        # LSTM forward pass
-        lstm_out, _ = self.lstm(x, (h0, c0))
+    def encode(self, x, state: Optional[Tuple[torch.Tensor, torch.Tensor]] = None):
+        """Run the LSTM over x, continuing from a cached (h, c) state if one is given"""
+        # LSTM forward pass (a None state starts from zeros inside the LSTM kernel,
+        # without allocating h0/c0 tensors here)
+        lstm_out, state = self.lstm(x, state)
         
         # Take the last output
-        lstm_out = lstm_out[:, -1, :]
-        
-        # Physics-informed processing
+        return lstm_out[:, -1, :], state
+    
+    def head(self, lstm_out):
+        """Physics-informed layers on top of the last LSTM output"""
         physics_out = self.dropout(self.relu(self.physics_layer(lstm_out)))
         diffusion_out = self.dropout(self.tanh(self.diffusion_layer(physics_out)))
         
-        # Final prediction
+        # Final prediction: one column per forecast horizon [Batch, output_size]
         output = self.output_layer(diffusion_out)
         
         return output
+    
+    def forward(self, x):
+        lstm_out, _ = self.encode(x)
+        return self.head(lstm_out)
 
-def create_model():
-    """Create and return AirPhyNet model"""
-    model = AirPhyNet(input_size=4, hidden_size=64, num_layers=2, output_size=1)
+def create_model(output_size=FORECAST_HORIZON):
+    """Create and return AirPhyNet model with one output per forecast horizon"""
+    model = AirPhyNet(input_size=4, hidden_size=64, num_layers=2, output_size=output_size)
     return model
 
 def preprocess_data(data):
     """Preprocess sensor data for model input using Fixed Constants (Approximate Training Dist)"""
-    data_array = np.array(data)
+    # data shape is (Seq_Len, 4); a float32 array (window cache) is used without a copy
+    data_array = np.asarray(data, dtype=np.float32)
+    
+    # Broadcast subtraction/scaling into a single new float32 array
+    normalized_data = data_array - FEATURE_MEANS
+    normalized_data *= FEATURE_SCALE
     
-    # Approx stats (Temp, Hum, CO2, AQI)
-    # Based on typical sensor ranges:
-    # Temp: 20-40 -> Mean 30, Std 10
-    # Hum: 40-80 -> Mean 60, Std 20
-    # CO2: 400-2000 -> Mean 1000, Std 500
-    # AQI: 0-300 -> Mean 100, Std 50
-    means = np.array([30.0, 60.0, 1000.0, 100.0])
-    stds = np.array([10.0, 20.0, 500.0, 50.0])
+    return torch.from_numpy(normalized_data).unsqueeze(0)
+
+class InputBuffer:
+    """
+    Reusable float32 [Batch, Seq_Len, 4] model input. Windows are copied and
+    normalized in place, and the returned tensor shares the buffer's memory, so
+    serving a batch allocates no input arrays or tensors once the buffer has grown
+    to the largest batch seen. Not thread-safe: use input_buffer() for the calling thread's.
+    """
     
-    # Broadcast subtraction/division
-    # data_array shape is (Seq_Len, 4)
-    normalized_data = (data_array - means) / (stds + 1e-8)
+    def __init__(self):
+        self._buffers = {}   # Seq_Len -> (array, tensor sharing its memory)
     
-    return torch.FloatTensor(normalized_data).unsqueeze(0)
+    def fill(self, windows):
+        """Normalize `windows` (same length each) into the buffer; valid until the next fill"""
+        batch_size, seq_len = len(windows), len(windows[0])
+        array, tensor = self._buffers.get(seq_len, (None, None))
+        if array is None or array.shape[0] < batch_size:
+            capacity = max(batch_size, 2 * array.shape[0] if array is not None else 1)
+            array = np.empty((capacity, seq_len, NUM_FEATURES), dtype=np.float32)
+            tensor = torch.from_numpy(array)
+            self._buffers[seq_len] = (array, tensor)
+        
+        batch = array[:batch_size]
+        for i, window in enumerate(windows):
+            batch[i] = window
+        np.subtract(batch, FEATURE_MEANS, out=batch)
+        np.multiply(batch, FEATURE_SCALE, out=batch)
+        return tensor[:batch_size]
+
+_thread_buffers = threading.local()
+
+def input_buffer():
+    """The InputBuffer of the calling thread (inference executor workers and the event loop each get one)"""
+    buffer = getattr(_thread_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _thread_buffers.buffer = InputBuffer()
+    return buffer
+
+def horizon_values(prediction, hours_ahead):
+    """
+    Pick horizons 1..hours_ahead from a multi-horizon prediction.
+    Raises ValueError beyond the model's head (e.g. legacy single-output weights)
+    instead of extrapolating its last horizon.
+    """
+    if hours_ahead > len(prediction):
+        raise ValueError(f"Model forecasts {len(prediction)} hours ahead, {hours_ahead} requested")
+    return list(prediction[:hours_ahead])
 
 def predict_aqi(model, sensor_data, hours_ahead=6):
     """Predict AQI for future hours"""
+    return horizon_values(predict_aqi_batch(model, [sensor_data])[0], hours_ahead)[-1]
+
+def predict_aqi_batch(model, windows):
+    """Predict CO2 for several sensor windows in a single forward pass, all horizons at once"""
     model.eval()
     
     with torch.no_grad():
-        # Preprocess input data
-        input_tensor = preprocess_data(sensor_data)
+        # Every window normalized into one reusable [Batch, Seq_Len, 4] tensor
+        input_tensor = input_buffer().fill(windows)
         
-        # Make prediction
         prediction = model(input_tensor)
         
-        # Convert to CO2 PPM (Scale 0-5000 approx)
+        # Convert to CO2 PPM (Scale 0-5000 approx), in place on the fresh output
         # Using 5000 as a safe upper bound for indoor CO2
-        co2_prediction = torch.clamp(prediction * 100, 0, 5000)
+        co2_prediction = prediction.mul_(100).clamp_(0, 5000)
         
-        return co2_prediction.item()
\ No newline at end of file
+        # One list of horizon values per window
+        return co2_prediction.tolist()
+
+# --- INCREMENTAL (STATEFUL) INFERENCE ---
+# The LSTM state of a sensor is cached between calls and advanced one reading at a time,
+# so a forecast only needs the physics/output head instead of replaying the whole window.
+
+def encode_window(model, sensor_data):
+    """Run a full window from a zero state and return the LSTM (h, c) state"""
+    model.eval()
+    
+    with torch.no_grad():
+        _, state = model.encode(input_buffer().fill([sensor_data]))
+        return state
+
+def advance_state(model, state, reading):
+    """Advance a cached (h, c) state by exactly one new reading"""
+    model.eval()
+    
+    with torch.no_grad():
+        _, state = model.encode(input_buffer().fill([[reading]]), state)
+        return state
+
+def predict_from_state(model, state):
+    """Forecast all horizons from a cached LSTM state (last layer hidden = last LSTM output)"""
+    model.eval()
+    
+    with torch.no_grad():
+        prediction = model.head(state[0][-1])
+        co2_prediction = prediction.mul_(100).clamp_(0, 5000)
+        return co2_prediction[0].tolist()
@@ -0,0 +1,229 @@
+import math
+import os
+import re
+import time
+from typing import Optional
+
+from prometheus_client import Counter, Gauge
+
+# torch, numpy (via model.py) and mlflow are imported inside load_serving_model so
+# inference_api can bind its port before the model stack is ready
+
+# Configuration
+MLFLOW_MODEL_URI = os.getenv("MLFLOW_MODEL_URI")
+LOCAL_WEIGHTS_PATH = os.getenv("LOCAL_WEIGHTS_PATH", "airphynet_weights.pth")
+MODEL_WATCH_INTERVAL_SECONDS = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", 0))   # 0 = no registry polling
+MODEL_CANARY_MAX_DELTA = float(os.getenv("MODEL_CANARY_MAX_DELTA", 0))   # Max mean CO2 change vs current model, 0 = off
+WARMUP_SEQ_LENGTH = 10
+
+# Canary windows (Temp, Hum, CO2, AQI): clean, humid, stuffy room and a rising CO2 ramp
+CANARY_WINDOWS = [
+    [[24.0, 50.0, 420.0, 20]] * WARMUP_SEQ_LENGTH,
+    [[31.0, 80.0, 600.0, 55]] * WARMUP_SEQ_LENGTH,
+    [[27.0, 60.0, 1800.0, 160]] * WARMUP_SEQ_LENGTH,
+    [[26.0, 55.0, 450.0 + 120.0 * i, 40 + 8 * i] for i in range(WARMUP_SEQ_LENGTH)],
+]
+
+# models:/<name>/<stage or version> or models:/<name>@<alias>
+REGISTRY_URI = re.compile(r"^models:/(?P<name>[^/@]+)(?:/(?P<ref>[^/]+)|@(?P<alias>[^/]+))$")
+
+
+# Prometheus Metrics
+MODEL_INFO = Gauge('model_info', 'Model currently serving predictions (value is always 1)', ['version', 'backend'])
+MODEL_SWAPS = Counter('model_swaps_total', 'Model hot-swap attempts', ['result'])
+
+
+class CanaryCheckFailed(Exception):
+    """Raised when a candidate model gives unusable output on the canary windows"""
+
+
+class HotSwapUnsupported(Exception):
+    """Raised when the serving backend runs a fixed exported artifact that a registry version cannot replace"""
+
+
+class LoadedModel:
+    """
+    A model ready to serve: the callable model, the version string used to key
+    caches, the backend it runs on and the model.py helpers bound to it.
+    """
+
+    def __init__(self, model, version: str, backend: str, ops, model_uri: Optional[str] = None):
+        self.model = model
+        self.version = version
+        self.backend = backend
+        self.model_uri = model_uri   # Registry URI it was loaded from, pinned to a version
+        self.horizons: Optional[int] = None   # Hours its head forecasts, known after warm_up
+        self._ops = ops
+        # Incremental inference needs the LSTM state API (eager and TorchScript, not ONNX)
+        self.supports_state = hasattr(model, "encode")
+
+    def predict_batch(self, windows):
+        return self._ops.predict_aqi_batch(self.model, windows)
+
+    def encode_window(self, sensor_data):
+        return self._ops.encode_window(self.model, sensor_data)
+
+    def advance_state(self, state, reading):
+        return self._ops.advance_state(self.model, state, reading)
+
+    def predict_from_state(self, state):
+        return self._ops.predict_from_state(self.model, state)
+
+    def horizon_values(self, prediction, hours_ahead):
+        return self._ops.horizon_values(prediction, hours_ahead)
+
+
+def load_serving_model(model_uri: Optional[str] = MLFLOW_MODEL_URI, weights_path: str = LOCAL_WEIGHTS_PATH,
+                       fallback: bool = True) -> LoadedModel:
+    """
+    Build the serving model: MLflow registry or local weights, optional int8
+    quantization, then the configured backend. If the weights cannot be loaded
+    this falls back to random initialization, or raises when `fallback` is False
+    (hot-swaps must never replace a trained model with an untrained one).
+    Blocking; run it off the event loop.
+    """
+    import torch
+    import model as ops
+    from backends import (
+        load_backend, quantize_dynamic_int8,
+        INFERENCE_BACKEND, TORCHSCRIPT_MODEL_PATH, ONNX_MODEL_PATH, QUANTIZE_INT8
+    )
+    from inference_executor import configure_torch_threads
+
+    # Torch thread pools (INFERENCE_INTRA_OP_THREADS / INFERENCE_INTER_OP_THREADS)
+    configure_torch_threads()
+
+    model = ops.create_model()
+    version = "untrained"  # Identifies the active model in caches
+
+    try:
+        if model_uri:
+            import mlflow.pytorch
+
+            print(f"Attempting to load model from MLflow: {model_uri}")
+            model = mlflow.pytorch.load_model(model_uri)
+            version = model_uri
+            print("Successfully loaded model from MLflow Registry")
+        else:
+            # Fallback to local
+            state_dict = torch.load(weights_path, map_location='cpu')
+            # Match the output head to the checkpoint (single-output legacy or multi-horizon)
+            model = ops.create_model(output_size=state_dict["output_layer.weight"].shape[0])
+            model.load_state_dict(state_dict)
+            version = f"local:{weights_path}"
+            print("Loaded pre-trained model weights from disk")
+    except Exception as e:
+        if not fallback:
+            raise
+        print(f"Warning: Could not load pre-trained model ({e}). Using random initialization.")
+
+    # Opt-in dynamic int8 quantization of the eager model (QUANTIZE_INT8=true)
+    # Exported TorchScript/ONNX artifacts are quantized at export time instead (export_model.py --quantize)
+    if QUANTIZE_INT8 and INFERENCE_BACKEND == "eager":
+        try:
+            model = quantize_dynamic_int8(model)
+            version = f"{version}+int8"
+            print("Serving dynamic int8 quantized model")
+        except Exception as e:
+            print(f"Warning: Could not quantize model ({e}). Serving fp32.")
+
+    # Serving backend: eager PyTorch, TorchScript or ONNX Runtime (artifacts from export_model.py)
+    backend = "eager"
+    if INFERENCE_BACKEND != "eager":
+        try:
+            model = load_backend(INFERENCE_BACKEND)
+            artifact = TORCHSCRIPT_MODEL_PATH if INFERENCE_BACKEND == "torchscript" else ONNX_MODEL_PATH
+            version = f"{INFERENCE_BACKEND}:{artifact}"
+            backend = INFERENCE_BACKEND
+            print(f"Serving with {INFERENCE_BACKEND} backend ({artifact})")
+        except Exception as e:
+            print(f"Warning: Could not load {INFERENCE_BACKEND} backend ({e}). Falling back to eager PyTorch.")
+
+    return LoadedModel(model, version, backend, ops, model_uri=model_uri)
+
+
+def check_hot_swap_supported():
+    """
+    Hot-swaps load registry models, which only the eager backend serves as is.
+    TorchScript and ONNX serve the artifact export_model.py wrote, so a swap
+    would reload that same file under the same version; refuse it instead.
+    """
+    from backends import INFERENCE_BACKEND
+
+    if INFERENCE_BACKEND != "eager":
+        raise HotSwapUnsupported(
+            f"INFERENCE_BACKEND={INFERENCE_BACKEND} serves an exported artifact; "
+            "export the new version and restart to change models"
+        )
+
+
+def record_active_model(loaded: LoadedModel, previous: Optional[LoadedModel] = None):
+    """Point the model_info metric at the model now serving"""
+    if previous is not None:
+        try:
+            MODEL_INFO.remove(previous.version, previous.backend)
+        except KeyError:
+            pass
+    MODEL_INFO.labels(version=loaded.version, backend=loaded.backend).set(1)
+
+
+def resolve_model_uri(model_uri: Optional[str]) -> Optional[str]:
+    """
+    Pin a registry stage or alias (models:/AirPhyNet/Production, models:/AirPhyNet@champion)
+    to the version it currently points at, e.g. models:/AirPhyNet/7. Other URIs are
+    returned unchanged. Blocking; run it off the event loop.
+    """
+    match = REGISTRY_URI.match(model_uri or "")
+    if not match or (match.group("ref") or "").isdigit():
+        return model_uri
+
+    from mlflow.tracking import MlflowClient
+
+    name = match.group("name")
+    client = MlflowClient()
+    if match.group("alias"):
+        version = client.get_model_version_by_alias(name, match.group("alias")).version
+    else:
+        versions = client.get_latest_versions(name, stages=[match.group("ref")])
+        if not versions:
+            raise LookupError(f"No version of {name} in stage {match.group('ref')}")
+        version = versions[0].version
+    return f"models:/{name}/{version}"
+
+
+def warm_up(loaded: LoadedModel, stateful: bool = False) -> float:
+    """
+    Run representative forward passes so lazy initialization (kernel selection,
+    allocator pools, ONNX Runtime session setup) happens before readiness.
+    Returns the warm-up time in seconds.
+    """
+    start = time.perf_counter()
+    # Typical indoor reading (Temp, Hum, CO2, AQI)
+    window = [[25.0, 55.0, 450.0, 40]] * WARMUP_SEQ_LENGTH
+    loaded.horizons = len(loaded.predict_batch([window])[0])
+    loaded.predict_batch([window, window])
+    if stateful:
+        state = loaded.encode_window(window)
+        state = loaded.advance_state(state, window[-1])
+        loaded.predict_from_state(state)
+    return time.perf_counter() - start
+
+
+def canary_check(candidate: LoadedModel, reference: Optional[LoadedModel] = None):
+    """
+    Run the canary windows through a candidate model before it is swapped in.
+    Every horizon must be finite; with MODEL_CANARY_MAX_DELTA set, the mean
+    change against the current model must also stay within that many ppm.
+    """
+    outputs = candidate.predict_batch(CANARY_WINDOWS)
+    if len(outputs) != len(CANARY_WINDOWS) or not all(outputs):
+        raise CanaryCheckFailed("Candidate returned no forecast for some canary windows")
+    if not all(math.isfinite(value) for horizons in outputs for value in horizons):
+        raise CanaryCheckFailed("Candidate returned non-finite forecasts")
+
+    if reference is not None and MODEL_CANARY_MAX_DELTA > 0:
+        # Compare the first horizon, which every head (legacy single-output included) has
+        current = reference.predict_batch(CANARY_WINDOWS)
+        delta = sum(abs(new[0] - old[0]) for new, old in zip(outputs, current)) / len(outputs)
+        if delta > MODEL_CANARY_MAX_DELTA:
+            raise CanaryCheckFailed(f"Mean canary change {delta:.1f} ppm exceeds MODEL_CANARY_MAX_DELTA={MODEL_CANARY_MAX_DELTA}")
@@ -0,0 +1,27 @@
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# Connection pool tuning (defaults sized for one API replica talking to Atlas)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 10))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+
+
+def create_async_client(uri: str) -> AsyncIOMotorClient:
+    """
+    Create a non-blocking MongoDB client for the FastAPI service.
+
+    Every operation returns an awaitable, so a slow Atlas query only suspends the
+    request that issued it instead of stalling the whole event loop. Warm
+    connections (minPoolSize) avoid paying the TLS handshake on bursts.
+    """
+    return AsyncIOMotorClient(
+        uri,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    )
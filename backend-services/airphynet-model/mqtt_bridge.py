@@ -4,6 +4,8 @@ import ssl
 import logging
 import paho.mqtt.client as mqtt
 from dotenv import load_dotenv
+from dedup import TELEMETRY_DEDUP, DedupFilter
+from ingest_pipeline import telemetry_document
 
 # Load ENV
 load_dotenv()
@@ -27,11 +29,23 @@ LOCAL_PORT = 1883
 LOCAL_USER = os.getenv("MQTT_USERNAME", "")
 LOCAL_PASS = os.getenv("MQTT_PASSWORD", "")
 
+# Copies of a reading (cloud redeliveries, device retries) are forwarded once
+dedup_filter = DedupFilter() if TELEMETRY_DEDUP else None
+
+def is_duplicate(topic, payload):
+    if dedup_filter is None:
+        return False
+    try:
+        reading = telemetry_document(topic, payload)
+    except Exception:
+        return False  # Not telemetry (or invalid): forward as-is and let the ingestor decide
+    return dedup_filter.seen(reading.get('sensor_id'), reading.get('dedup_key'))
+
 # --- CLIENTS ---
 
 def create_cloud_client():
     # Use WebSockets to bypass Firewall
-    client = mqtt.Client(client_id="python_bridge_cloud_in", transport='websockets')
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id="python_bridge_cloud_in", transport='websockets')
     client.ws_set_options(path="/mqtt")
     client.username_pw_set(CLOUD_USER, CLOUD_PASS)
     
@@ -39,17 +53,20 @@ def create_cloud_client():
     client.tls_set(cert_reqs=ssl.CERT_NONE, tls_version=ssl.PROTOCOL_TLSv1_2)
     client.tls_insecure_set(True)
     
-    def on_connect(c, userdata, flags, rc):
-        if rc == 0:
+    def on_connect(c, userdata, flags, reason_code, properties):
+        if not reason_code.is_failure:
             logger.info("Connected to CLOUD Broker!")
             c.subscribe(TOPIC_SOURCE)
         else:
-            logger.error(f"Failed to connect to Cloud: {rc}")
+            logger.error(f"Failed to connect to Cloud: {reason_code}")
 
     def on_message(c, userdata, msg):
         try:
             payload = msg.payload
             topic = msg.topic
+            if is_duplicate(topic, payload):
+                logger.info(f"Skipping duplicate: {topic}")
+                return
             logger.info(f"Forwarding: {topic}")
             # Forward to Local
             local_client.publish(topic, payload)
@@ -61,15 +78,15 @@ def create_cloud_client():
     return client
 
 def create_local_client():
-    client = mqtt.Client(client_id="python_bridge_local_out")
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id="python_bridge_local_out")
     if LOCAL_USER and LOCAL_PASS:
         client.username_pw_set(LOCAL_USER, LOCAL_PASS)
     
-    def on_connect(c, userdata, flags, rc):
-        if rc == 0:
+    def on_connect(c, userdata, flags, reason_code, properties):
+        if not reason_code.is_failure:
             logger.info("Connected to LOCAL Broker!")
         else:
-            logger.error(f"Failed to connect to Local: {rc}")
+            logger.error(f"Failed to connect to Local: {reason_code}")
 
     client.on_connect = on_connect
     return client
@@ -0,0 +1,93 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional
+
+from prometheus_client import Counter, Gauge
+
+# Configuration
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", 300))
+PREDICTION_CACHE_MAX_SENSORS = int(os.getenv("PREDICTION_CACHE_MAX_SENSORS", 10000))
+
+# Prometheus Metrics (served by the app's /metrics endpoint through the default registry)
+PREDICTION_CACHE_REQUESTS = Counter(
+    'prediction_cache_requests_total', 'Forecast cache lookups', ['endpoint', 'result']
+)
+PREDICTION_CACHE_SENSORS = Gauge('prediction_cache_sensors', 'Sensors with a cached forecast')
+
+
+def _reading_key(reading_at):
+    """
+    Reading timestamp at MongoDB's millisecond precision, so a timestamp read
+    back from sensor_logs matches the one /ingest kept in the window cache
+    """
+    if isinstance(reading_at, datetime):
+        return reading_at.replace(microsecond=reading_at.microsecond // 1000 * 1000)
+    return reading_at
+
+
+class _CachedForecast:
+    __slots__ = ("reading_at", "model_version", "horizons", "doc", "expires_at")
+
+    def __init__(self, reading_at, model_version: str, horizons: List[float], doc: dict, ttl: float):
+        self.reading_at = reading_at          # Timestamp of the newest reading used
+        self.model_version = model_version
+        self.horizons = horizons              # Raw model output for every horizon
+        self.doc = doc                        # Prediction document as stored in MongoDB
+        self.expires_at = time.monotonic() + ttl
+
+
+class PredictionCache:
+    """
+    LRU/TTL cache of the latest forecast per sensor.
+
+    An entry is only valid for the (sensor_id, newest reading timestamp, model
+    version) it was computed from. /ingest invalidates the sensor explicitly, and
+    a different reading timestamp or model version is treated as a miss.
+    """
+
+    def __init__(self, ttl_seconds: float = PREDICTION_CACHE_TTL_SECONDS,
+                 max_sensors: int = PREDICTION_CACHE_MAX_SENSORS):
+        self.ttl = ttl_seconds
+        self.max_sensors = max(1, max_sensors)
+        self._entries: "OrderedDict[str, _CachedForecast]" = OrderedDict()
+
+    def _lookup(self, sensor_id: str, model_version: str) -> Optional[_CachedForecast]:
+        entry = self._entries.get(sensor_id)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic() or entry.model_version != model_version:
+            self.invalidate(sensor_id)
+            return None
+        self._entries.move_to_end(sensor_id)
+        return entry
+
+    def get(self, sensor_id: str, reading_at, model_version: str) -> Optional[_CachedForecast]:
+        """Forecast computed from exactly this reading and model version, if any"""
+        entry = self._lookup(sensor_id, model_version) if reading_at is not None else None
+        if entry is not None and entry.reading_at != _reading_key(reading_at):
+            entry = None
+        PREDICTION_CACHE_REQUESTS.labels(endpoint="predict", result="hit" if entry else "miss").inc()
+        return entry
+
+    def latest_doc(self, sensor_id: str, model_version: str) -> Optional[dict]:
+        """Latest stored prediction document for /predictions/{sensor_id}"""
+        entry = self._lookup(sensor_id, model_version)
+        PREDICTION_CACHE_REQUESTS.labels(endpoint="predictions", result="hit" if entry else "miss").inc()
+        return entry.doc if entry else None
+
+    def put(self, sensor_id: str, reading_at, model_version: str, horizons: List[float], doc: dict):
+        self._entries[sensor_id] = _CachedForecast(_reading_key(reading_at), model_version, horizons, doc, self.ttl)
+        self._entries.move_to_end(sensor_id)
+        while len(self._entries) > self.max_sensors:
+            self._entries.popitem(last=False)
+        PREDICTION_CACHE_SENSORS.set(len(self._entries))
+
+    def invalidate(self, sensor_id: Optional[str] = None):
+        """Drop one sensor's forecast (new reading) or all of them (model change)"""
+        if sensor_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(sensor_id, None)
+        PREDICTION_CACHE_SENSORS.set(len(self._entries))
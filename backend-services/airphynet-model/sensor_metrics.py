@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Configuration
+SENSOR_METRICS_MAX_SENSORS = int(os.getenv("SENSOR_METRICS_MAX_SENSORS", 2000))      # Per-sensor series cap
+SENSOR_METRICS_TTL_SECONDS = float(os.getenv("SENSOR_METRICS_TTL_SECONDS", 3600))    # Idle sensors are dropped after this
+SWEEP_INTERVAL_SECONDS = 60
+OVERFLOW_SENSOR_ID = "_overflow"   # Shared series for sensors beyond the cap
+
+# Prometheus Metrics (shared by inference_api.py and ingestor.py, each exposing its own registry)
+SENSOR_GAUGES = {
+    "temperature": Gauge('sensor_temperature_celsius', 'Temperature from sensor', ['sensor_id']),
+    "humidity": Gauge('sensor_humidity_percent', 'Humidity from sensor', ['sensor_id']),
+    "co2_ppm": Gauge('sensor_co2_ppm', 'CO2 PPM from sensor', ['sensor_id']),
+    "aqi": Gauge('sensor_aqi', 'Calculated AQI from sensor', ['sensor_id']),
+    "rssi": Gauge('sensor_rssi_dbm', 'WiFi Signal Strength (dBm)', ['sensor_id']),
+    "uptime": Gauge('sensor_uptime_seconds', 'Device Uptime in seconds', ['sensor_id']),
+}
+# Fleet-wide distributions: constant size however many sensors report
+FLEET_HISTOGRAMS = {
+    "temperature": Histogram(
+        'sensor_fleet_temperature_celsius', 'Temperature readings across the fleet',
+        buckets=(10, 15, 18, 20, 22, 24, 26, 28, 30, 32, 35, 40, 45)
+    ),
+    "humidity": Histogram(
+        'sensor_fleet_humidity_percent', 'Humidity readings across the fleet',
+        buckets=(20, 30, 40, 50, 60, 70, 80, 90, 100)
+    ),
+    "co2_ppm": Histogram(
+        'sensor_fleet_co2_ppm', 'CO2 readings across the fleet',
+        buckets=(400, 600, 800, 1000, 1200, 1500, 2000, 2500, 3000, 5000)
+    ),
+    "aqi": Histogram(
+        'sensor_fleet_aqi', 'AQI readings across the fleet',
+        buckets=(25, 50, 75, 100, 150, 200, 300, 500)
+    ),
+}
+SENSOR_SERIES = Gauge('sensor_metrics_series', 'Sensors with their own per-sensor metric series')
+SENSOR_SERIES_EVICTED = Counter('sensor_metrics_evicted_total', 'Per-sensor series removed after SENSOR_METRICS_TTL_SECONDS idle')
+SENSOR_SERIES_OVERFLOW = Counter(
+    'sensor_metrics_overflow_total', f'Readings recorded under sensor_id="{OVERFLOW_SENSOR_ID}" (cap reached)'
+)
+
+
+class _Series:
+    """Cached label children of one sensor, created on first use per metric"""
+
+    __slots__ = ("gauges", "counters", "last_seen")
+
+    def __init__(self):
+        self.gauges: Dict[str, object] = {}
+        self.counters: list = []
+        self.last_seen = 0.0
+
+
+class SensorMetrics:
+    """
+    Per-sensor Prometheus series with bounded cardinality. Label children are
+    cached, so a reading costs a dict lookup per metric instead of labels().
+    Sensors idle for `ttl_seconds` are removed from the registry (swept at most
+    once a minute, from `observe`); beyond `max_sensors`, new sensors share the
+    OVERFLOW_SENSOR_ID series until old ones expire. Every reading also feeds
+    the fleet histograms. Thread-safe.
+    """
+
+    def __init__(self, counters: Sequence[Counter] = (), max_sensors: int = SENSOR_METRICS_MAX_SENSORS,
+                 ttl_seconds: float = SENSOR_METRICS_TTL_SECONDS):
+        self.counters = tuple(counters)   # Extra per-sensor counters incremented once per reading
+        self.max_sensors = max_sensors
+        self.ttl_seconds = ttl_seconds
+        self._series: "OrderedDict[str, _Series]" = OrderedDict()   # Least recently seen first
+        self._overflow = _Series()
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def __len__(self):
+        return len(self._series)
+
+    def observe(self, sensor_id: str, **values: Optional[float]):
+        """Record one reading; fields are keys of SENSOR_GAUGES, None values are skipped"""
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._evict_idle(now)
+
+            series = self._series.get(sensor_id)
+            if series is not None:
+                self._series.move_to_end(sensor_id)
+                label = sensor_id
+            elif len(self._series) < self.max_sensors:
+                series = self._series[sensor_id] = _Series()
+                series.counters = [counter.labels(sensor_id=sensor_id) for counter in self.counters]
+                SENSOR_SERIES.set(len(self._series))
+                label = sensor_id
+            else:
+                series = self._overflow
+                if not series.counters:
+                    series.counters = [counter.labels(sensor_id=OVERFLOW_SENSOR_ID) for counter in self.counters]
+                SENSOR_SERIES_OVERFLOW.inc()
+                label = OVERFLOW_SENSOR_ID
+            series.last_seen = now
+
+            for field, value in values.items():
+                if value is None:
+                    continue
+                gauge = series.gauges.get(field)
+                if gauge is None:
+                    gauge = series.gauges[field] = SENSOR_GAUGES[field].labels(sensor_id=label)
+                gauge.set(value)
+            for counter in series.counters:
+                counter.inc()
+
+        for field, value in values.items():
+            histogram = FLEET_HISTOGRAMS.get(field)
+            if histogram is not None and value is not None:
+                histogram.observe(value)
+
+    def evict_idle(self):
+        """Remove the series of sensors idle for longer than the TTL"""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+    def _evict_idle(self, now: float):
+        self._next_sweep = now + min(SWEEP_INTERVAL_SECONDS, self.ttl_seconds)
+        cutoff = now - self.ttl_seconds
+        evicted = 0
+        while self._series:
+            sensor_id, series = next(iter(self._series.items()))
+            if series.last_seen > cutoff:
+                break
+            del self._series[sensor_id]
+            for field in series.gauges:
+                SENSOR_GAUGES[field].remove(sensor_id)
+            for counter in self.counters:
+                counter.remove(sensor_id)
+            evicted += 1
+        if evicted:
+            SENSOR_SERIES_EVICTED.inc(evicted)
+            SENSOR_SERIES.set(len(self._series))
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from prometheus_client import Counter
+
+# Configuration
+SETTINGS_CACHE_TTL_SECONDS = float(os.getenv("SETTINGS_CACHE_TTL_SECONDS", 60))
+SETTINGS_CACHE_REVALIDATE_SECONDS = float(os.getenv("SETTINGS_CACHE_REVALIDATE_SECONDS", 5))  # Min gap between reloads forced by revalidate()
+
+# Prometheus Metrics
+SETTINGS_CACHE_REQUESTS = Counter('settings_cache_requests_total', 'System settings cache lookups', ['result'])
+
+
+class SettingsCache:
+    """
+    In-process TTL cache for the global `system_settings` document.
+
+    `loader` is awaited on a miss; concurrent misses share a single load. A
+    missing document is cached as well, so unknown keys do not hit MongoDB on
+    every request. Call `invalidate()` when the settings are known to have changed,
+    or `revalidate()` when a cached value looks out of date (e.g. a freshly rotated
+    key is rejected); the latter reloads at most once per `revalidate_seconds`.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Optional[dict]]], ttl_seconds: float = SETTINGS_CACHE_TTL_SECONDS,
+                 revalidate_seconds: float = SETTINGS_CACHE_REVALIDATE_SECONDS):
+        self.loader = loader
+        self.ttl = ttl_seconds
+        self.revalidate_seconds = revalidate_seconds
+        self._value: Optional[dict] = None
+        self._expires_at = 0.0
+        self._loaded_at = float("-inf")
+        self._lock = None
+
+    async def get(self) -> Optional[dict]:
+        if time.monotonic() < self._expires_at:
+            SETTINGS_CACHE_REQUESTS.labels(result="hit").inc()
+            return self._value
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another request may have refreshed the settings while we waited
+            if time.monotonic() < self._expires_at:
+                SETTINGS_CACHE_REQUESTS.labels(result="hit").inc()
+                return self._value
+
+            SETTINGS_CACHE_REQUESTS.labels(result="miss").inc()
+            return await self._load()
+
+    async def revalidate(self) -> Optional[dict]:
+        """Reload now unless the cached value was loaded within `revalidate_seconds`"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if time.monotonic() - self._loaded_at < self.revalidate_seconds:
+                SETTINGS_CACHE_REQUESTS.labels(result="hit").inc()
+                return self._value
+
+            SETTINGS_CACHE_REQUESTS.labels(result="revalidate").inc()
+            return await self._load()
+
+    async def _load(self) -> Optional[dict]:
+        self._value = await self.loader()
+        self._loaded_at = time.monotonic()
+        self._expires_at = self._loaded_at + self.ttl
+        return self._value
+
+    def invalidate(self):
+        self._expires_at = 0.0
@@ -0,0 +1,297 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+import bson
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo.errors import BulkWriteError
+
+# Configuration
+INGEST_SPOOL = os.getenv("INGEST_SPOOL", "true").lower() == "true"   # Spool writes that fail during outages
+INGEST_SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", "spool")
+INGEST_SPOOL_MAX_MB = float(os.getenv("INGEST_SPOOL_MAX_MB", 256))   # Appends are refused beyond this
+INGEST_SPOOL_REPLAY_BATCH_SIZE = int(os.getenv("INGEST_SPOOL_REPLAY_BATCH_SIZE", 1000))
+INGEST_SPOOL_REPLAY_INTERVAL_SECONDS = float(os.getenv("INGEST_SPOOL_REPLAY_INTERVAL_SECONDS", 5))
+RETRY_BACKOFF_MAX_SECONDS = 60
+DUPLICATE_KEY_ERROR = 11000
+
+# Prometheus Metrics
+SPOOL_DOCUMENTS = Gauge('ingest_spool_documents', 'Documents waiting in the local spool')
+SPOOL_BYTES = Gauge('ingest_spool_bytes', 'Size of the documents in the local spool')
+SPOOL_LAG = Gauge('ingest_spool_lag_seconds', 'Age of the oldest spooled document (0 when empty)')
+SPOOL_APPENDED = Counter('ingest_spool_appended_total', 'Documents written to the local spool')
+SPOOL_FULL = Counter('ingest_spool_full_total', 'Documents not spooled because INGEST_SPOOL_MAX_MB was reached')
+SPOOL_REPLAYED = Counter('ingest_spool_replayed_total', 'Spooled documents written to MongoDB')
+SPOOL_REPLAY_REJECTED = Counter('ingest_spool_replay_rejected_total', 'Spooled documents MongoDB refused (dropped)')
+SPOOL_REPLAY_FAILURES = Counter('ingest_spool_replay_failures_total', 'Replay batches that failed and will be retried')
+SPOOL_REPLAY_LATENCY = Histogram('ingest_spool_replay_seconds', 'insert_many latency per replayed batch')
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Lock files of the spool slots claimed by this process, held open until it exits
+_claimed_slots = []
+
+
+def claim_spool_path(directory: str, name: str) -> str:
+    """
+    Path of a spool file no other live process uses, for services that run
+    several workers from one directory (uvicorn --workers). Takes the first
+    `<name>-<n>.db` whose lock file it can lock exclusively, so a restarted
+    worker picks up the backlog a previous one left behind; slot 0 adopts a
+    legacy `<name>.db`. Without fcntl the file is named after the PID instead.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if fcntl is None:
+        return os.path.join(directory, f"{name}-{os.getpid()}.db")
+
+    slot = 0
+    while True:
+        lock_file = open(os.path.join(directory, f"{name}-{slot}.lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            slot += 1
+            continue
+        _claimed_slots.append(lock_file)
+        path = os.path.join(directory, f"{name}-{slot}.db")
+        legacy = os.path.join(directory, f"{name}.db")
+        if slot == 0 and os.path.exists(legacy) and not os.path.exists(path):
+            # Adopt the single shared spool file of earlier versions so its backlog is replayed
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(legacy + suffix):
+                    os.replace(legacy + suffix, path + suffix)
+        return path
+
+
+class Spool:
+    """
+    Append-only local spool for sensor_logs documents MongoDB could not take,
+    in SQLite (WAL mode, fsync on commit). Documents are stored as BSON, so
+    datetimes and the _id pymongo already assigned survive the round trip and a
+    replay cannot insert a reading twice. `append` returns False once the
+    spool holds `max_bytes`, so callers fall back to their own backpressure.
+    Thread-safe; give every process its own file (the size and lag metrics
+    are tracked in memory).
+    """
+
+    def __init__(self, path: str, max_bytes: float = INGEST_SPOOL_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA auto_vacuum=INCREMENTAL")   # Only takes effect on a new file
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY AUTOINCREMENT, spooled_at REAL NOT NULL, doc BLOB NOT NULL)"
+        )
+        self._count, self._bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(doc)), 0) FROM spool").fetchone()
+        self._oldest = self._oldest_spooled_at()
+
+        SPOOL_DOCUMENTS.set_function(self.__len__)
+        SPOOL_BYTES.set_function(lambda: self._bytes)
+        SPOOL_LAG.set_function(self.lag_seconds)
+        if self._count:
+            logger.info(f"Spool {path} holds {self._count} documents from a previous run")
+
+    def __len__(self):
+        return self._count
+
+    def _oldest_spooled_at(self) -> Optional[float]:
+        row = self._db.execute("SELECT spooled_at FROM spool ORDER BY id LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def lag_seconds(self) -> float:
+        oldest = self._oldest
+        return max(0.0, time.time() - oldest) if self._count and oldest is not None else 0.0
+
+    def append(self, docs: Sequence[dict]) -> bool:
+        """Durably store the documents; False if the spool is full or cannot be written"""
+        try:
+            rows = [bson.encode(doc) for doc in docs]
+        except Exception as e:
+            logger.error(f"Failed to encode {len(docs)} documents for the spool: {e}")
+            return False
+        size = sum(len(row) for row in rows)
+        now = time.time()
+        with self._lock:
+            if self._bytes + size > self.max_bytes:
+                SPOOL_FULL.inc(len(docs))
+                return False
+            try:
+                with self._db:
+                    self._db.execute("BEGIN")
+                    self._db.executemany("INSERT INTO spool (spooled_at, doc) VALUES (?, ?)", [(now, row) for row in rows])
+            except sqlite3.Error as e:
+                logger.error(f"Failed to spool {len(docs)} documents: {e}")
+                return False
+            if not self._count:
+                self._oldest = now
+            self._count += len(rows)
+            self._bytes += size
+        SPOOL_APPENDED.inc(len(docs))
+        return True
+
+    async def append_async(self, docs: Sequence[dict]) -> bool:
+        """`append` from a coroutine, in the default executor so the fsync does not block the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.append, docs)
+
+    def peek(self, limit: int) -> Tuple[Optional[int], List[dict]]:
+        """(id of the last document, oldest `limit` documents); (None, []) when empty"""
+        with self._lock:
+            rows = self._db.execute("SELECT id, doc FROM spool ORDER BY id LIMIT ?", (limit,)).fetchall()
+        if not rows:
+            return None, []
+        return rows[-1][0], [bson.decode(row[1]) for row in rows]
+
+    def remove_through(self, last_id: int):
+        """Delete every document up to and including `last_id` (they were replayed)"""
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                count, size = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(doc)), 0) FROM spool WHERE id <= ?", (last_id,)
+                ).fetchone()
+                self._db.execute("DELETE FROM spool WHERE id <= ?", (last_id,))
+            self._count -= count
+            self._bytes -= size
+            self._oldest = self._oldest_spooled_at()
+            if not self._count:
+                # Give the pages of a drained backlog back to the filesystem
+                self._db.execute("PRAGMA incremental_vacuum")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _replayed(docs: List[dict], error: Optional[BulkWriteError], seconds: float):
+    """Metrics for one replayed batch; duplicate keys are documents that were already written"""
+    rejected = 0
+    if error is not None:
+        rejected = sum(1 for write_error in error.details.get("writeErrors", []) if write_error.get("code") != DUPLICATE_KEY_ERROR)
+    if rejected:
+        logger.error(f"{rejected} spooled documents rejected by MongoDB, dropping them")
+        SPOOL_REPLAY_REJECTED.inc(rejected)
+    SPOOL_REPLAYED.inc(len(docs) - rejected)
+    SPOOL_REPLAY_LATENCY.observe(seconds)
+
+
+class SpoolReplayer:
+    """
+    Background thread that drains the spool into MongoDB with `writer(docs)`
+    (an unordered insert_many) in batches of `batch_size`, oldest first. It
+    checks every `interval_seconds` and backs off while MongoDB is unreachable.
+    """
+
+    def __init__(self, spool: Spool, writer: Callable[[List[dict]], object],
+                 batch_size: int = INGEST_SPOOL_REPLAY_BATCH_SIZE,
+                 interval_seconds: float = INGEST_SPOOL_REPLAY_INTERVAL_SECONDS):
+        self.spool = spool
+        self.writer = writer
+        self.batch_size = max(1, batch_size)
+        self.interval_seconds = interval_seconds
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="spool-replayer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        backoff = self.interval_seconds
+        while not self._stopping.is_set():
+            last_id, docs = self.spool.peek(self.batch_size)
+            if not docs:
+                self._stopping.wait(self.interval_seconds)
+                continue
+
+            start = time.perf_counter()
+            error = None
+            try:
+                self.writer(docs)
+            except BulkWriteError as e:
+                error = e
+            except Exception as e:
+                SPOOL_REPLAY_FAILURES.inc()
+                logger.error(f"Spool replay failed ({e}), {len(self.spool)} documents spooled, retrying in {backoff:.1f}s")
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX_SECONDS)
+                continue
+
+            _replayed(docs, error, time.perf_counter() - start)
+            self.spool.remove_through(last_id)
+            backoff = self.interval_seconds
+
+
+class AsyncSpoolReplayer:
+    """asyncio counterpart of SpoolReplayer with an async `writer` (motor); SQLite runs in the default executor"""
+
+    def __init__(self, spool: Spool, writer: Callable[[List[dict]], Awaitable],
+                 batch_size: int = INGEST_SPOOL_REPLAY_BATCH_SIZE,
+                 interval_seconds: float = INGEST_SPOOL_REPLAY_INTERVAL_SECONDS):
+        self.spool = spool
+        self.writer = writer
+        self.batch_size = max(1, batch_size)
+        self.interval_seconds = interval_seconds
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        backoff = self.interval_seconds
+        while True:
+            last_id, docs = await loop.run_in_executor(None, self.spool.peek, self.batch_size)
+            if not docs:
+                await asyncio.sleep(self.interval_seconds)
+                continue
+
+            start = time.perf_counter()
+            error = None
+            try:
+                await self.writer(docs)
+            except BulkWriteError as e:
+                error = e
+            except Exception as e:
+                SPOOL_REPLAY_FAILURES.inc()
+                logger.error(f"Spool replay failed ({e}), {len(self.spool)} documents spooled, retrying in {backoff:.1f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX_SECONDS)
+                continue
+
+            _replayed(docs, error, time.perf_counter() - start)
+            await loop.run_in_executor(None, self.spool.remove_through, last_id)
+            backoff = self.interval_seconds
@@ -5,6 +5,8 @@
 
 # Start the Ingestor in background - DISABLED (Using HTTP Ingestion)
 # python ingestor.py &
+# Or several ingestors sharing the MQTT subscription (INGESTOR_PROCESSES)
+# python ingestor_supervisor.py &
 
 # Start the API via uvicorn
 uvicorn inference_api:app --host 0.0.0.0 --port 8000
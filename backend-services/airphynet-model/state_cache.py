@@ -0,0 +1,108 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Sequence
+
+from prometheus_client import Counter, Gauge
+
+# Configuration
+INCREMENTAL_INFERENCE = os.getenv("INCREMENTAL_INFERENCE", "false").lower() == "true"
+STATE_CACHE_MAX_SENSORS = int(os.getenv("STATE_CACHE_MAX_SENSORS", 10000))
+STATE_RESYNC_EVERY = int(os.getenv("STATE_RESYNC_EVERY", 10))   # Readings between full-window re-syncs
+
+# Prometheus Metrics
+STATE_CACHE_REQUESTS = Counter('lstm_state_cache_requests_total', 'Cached LSTM state lookups', ['result'])
+STATE_CACHE_SENSORS = Gauge('lstm_state_cache_sensors', 'Sensors with a cached LSTM state')
+
+
+class _SensorState:
+    __slots__ = ("state", "steps", "reading_at")
+
+    def __init__(self, state, reading_at):
+        self.state = state            # (h, c) tensors of shape [num_layers, 1, hidden_size]
+        self.steps = 0                # Readings applied since the last full-window sync
+        self.reading_at = reading_at  # Timestamp of the newest reading the state includes
+
+
+class LSTMStateCache:
+    """
+    Bounded per-sensor cache of LSTM (h, c) states for incremental inference.
+
+    A state is created from a full window (`sync`), then advanced by one timestep
+    for every new reading (`advance`). Because the cached state keeps accumulating
+    history beyond the training window, it is treated as stale after
+    `resync_every` readings and the next prediction re-syncs it from the window.
+    Every state is stamped with the timestamp of its newest reading: `get` only
+    returns a state matching the window's newest reading, and `advance` only
+    applies a reading on top of the one before it, so a state can never skip or
+    lag behind a reading. Safe to use from the inference executor threads.
+    """
+
+    def __init__(self, max_sensors: int = STATE_CACHE_MAX_SENSORS, resync_every: int = STATE_RESYNC_EVERY):
+        self.max_sensors = max(1, max_sensors)
+        self.resync_every = max(1, resync_every)
+        self._states: "OrderedDict[str, _SensorState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sensor_id: str, reading_at):
+        """Return the state that includes the reading at `reading_at`, or None if it is missing, behind or due for a re-sync"""
+        with self._lock:
+            entry = self._states.get(sensor_id)
+            if entry is None or reading_at is None or entry.reading_at != reading_at or entry.steps >= self.resync_every:
+                STATE_CACHE_REQUESTS.labels(result="miss").inc()
+                return None
+
+            STATE_CACHE_REQUESTS.labels(result="hit").inc()
+            self._states.move_to_end(sensor_id)
+            return entry.state
+
+    def sync(self, sensor_id: str, state, reading_at):
+        """Store a state freshly computed from the full window ending with the reading at `reading_at`"""
+        with self._lock:
+            self._states[sensor_id] = _SensorState(state, reading_at)
+            self._states.move_to_end(sensor_id)
+            while len(self._states) > self.max_sensors:
+                self._states.popitem(last=False)
+            STATE_CACHE_SENSORS.set(len(self._states))
+
+    def advance(self, sensor_id: str, reading: Sequence[float], step_fn: Callable, previous_at, reading_at):
+        """
+        Apply the reading at `reading_at` to a cached state with `step_fn(state, reading)`.
+        The state must end with the reading before it (`previous_at`); otherwise it
+        missed a reading and is dropped.
+        """
+        with self._lock:
+            entry = self._states.get(sensor_id)
+            if entry is None or entry.reading_at == reading_at:
+                # Nothing cached, or already re-synced from a window that includes this reading
+                return
+            if entry.reading_at != previous_at or entry.steps >= self.resync_every:
+                # Behind the window, or about to be rebuilt from it anyway
+                del self._states[sensor_id]
+                STATE_CACHE_SENSORS.set(len(self._states))
+                return
+            state = entry.state
+
+        # Run the LSTM step outside the lock
+        new_state = step_fn(state, reading)
+
+        with self._lock:
+            if self._states.get(sensor_id) is not entry:
+                return  # Re-synced or evicted meanwhile
+            if entry.state is state:
+                entry.state = new_state
+                entry.steps += 1
+                entry.reading_at = reading_at
+            else:
+                # Another reading was applied concurrently; order is unknown, so re-sync
+                del self._states[sensor_id]
+                STATE_CACHE_SENSORS.set(len(self._states))
+
+    def invalidate(self, sensor_id: Optional[str] = None):
+        """Forget one sensor's state, or every state (e.g. after a model change)"""
+        with self._lock:
+            if sensor_id is None:
+                self._states.clear()
+            else:
+                self._states.pop(sensor_id, None)
+            STATE_CACHE_SENSORS.set(len(self._states))
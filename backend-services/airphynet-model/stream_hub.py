@@ -0,0 +1,120 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from prometheus_client import Counter, Gauge
+
+# Configuration
+STREAM_MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_SUBSCRIBERS", 1000))
+STREAM_MAX_PER_CLIENT = int(os.getenv("STREAM_MAX_PER_CLIENT", 10))       # Connections per client address
+STREAM_MAX_PENDING = int(os.getenv("STREAM_MAX_PENDING", 256))              # Frames waiting per subscriber
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", 15))  # Keeps proxies/tunnels from closing idle streams
+
+# Prometheus Metrics
+STREAM_SUBSCRIBERS = Gauge('stream_subscribers', 'Open live stream connections')
+STREAM_FRAMES_PUBLISHED = Counter('stream_frames_published_total', 'Frames published to the live stream hub', ['event'])
+STREAM_FRAMES_DROPPED = Counter(
+    'stream_frames_dropped_total', 'Frames a subscriber never received', ['reason']   # coalesced | overflow
+)
+
+
+def _json_default(value):
+    # datetimes from MongoDB documents, ObjectIds
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+class StreamFull(Exception):
+    """Raised when STREAM_MAX_SUBSCRIBERS connections are already open"""
+
+
+class TooManyStreams(StreamFull):
+    """Raised when one client already holds STREAM_MAX_PER_CLIENT connections"""
+
+
+class Subscription:
+    """
+    Pending frames of one subscriber, keyed by (event, sensor_id). A newer frame
+    for the same key replaces the one still waiting, so a slow consumer only ever
+    gets the latest reading/forecast per sensor. Beyond `max_pending` keys the
+    oldest frame is dropped.
+    """
+
+    def __init__(self, sensor_id: Optional[str], max_pending: int, client: Optional[str] = None):
+        self.sensor_id = sensor_id   # None = whole fleet
+        self.client = client
+        self.max_pending = max(1, max_pending)
+        self._pending: "OrderedDict[tuple, str]" = OrderedDict()
+        self._ready = asyncio.Event()
+
+    def push(self, key: tuple, frame: str):
+        if key in self._pending:
+            del self._pending[key]
+            STREAM_FRAMES_DROPPED.labels(reason="coalesced").inc()
+        elif len(self._pending) >= self.max_pending:
+            self._pending.popitem(last=False)
+            STREAM_FRAMES_DROPPED.labels(reason="overflow").inc()
+        self._pending[key] = frame
+        self._ready.set()
+
+    async def next_frame(self, timeout: float) -> Optional[str]:
+        """Oldest pending frame, or None if nothing arrived within `timeout` seconds"""
+        if not self._pending:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._pending.popitem(last=False)[1]
+
+
+class StreamHub:
+    """
+    Fan-out of live readings and forecasts to Server-Sent Events subscribers.
+    Frames are encoded once per publish and shared by every subscriber;
+    `publish` never blocks, whatever the speed of the consumers.
+    """
+
+    def __init__(self, max_subscribers: int = STREAM_MAX_SUBSCRIBERS, max_pending: int = STREAM_MAX_PENDING,
+                 max_per_client: int = STREAM_MAX_PER_CLIENT):
+        self.max_subscribers = max_subscribers
+        self.max_pending = max_pending
+        self.max_per_client = max_per_client
+        self._subscribers: Set[Subscription] = set()
+        self._per_client: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self, sensor_id: Optional[str] = None, client: Optional[str] = None) -> Subscription:
+        """`client` (the remote address) is limited to `max_per_client` open streams"""
+        if client is not None and self._per_client.get(client, 0) >= self.max_per_client:
+            raise TooManyStreams(f"Too many live streams from this client ({self.max_per_client})")
+        if len(self._subscribers) >= self.max_subscribers:
+            raise StreamFull(f"Live stream is full ({self.max_subscribers} subscribers)")
+        subscription = Subscription(sensor_id, self.max_pending, client)
+        self._subscribers.add(subscription)
+        if client is not None:
+            self._per_client[client] = self._per_client.get(client, 0) + 1
+        STREAM_SUBSCRIBERS.set(len(self._subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self._subscribers and subscription.client is not None:
+            remaining = self._per_client.pop(subscription.client) - 1
+            if remaining:
+                self._per_client[subscription.client] = remaining
+        self._subscribers.discard(subscription)
+        STREAM_SUBSCRIBERS.set(len(self._subscribers))
+
+    def publish(self, event: str, sensor_id: str, payload: dict):
+        """Queue an SSE frame for every subscriber of this sensor (or of the whole fleet)"""
+        if not self._subscribers:
+            return
+        frame = f"event: {event}\ndata: {json.dumps(payload, default=_json_default)}\n\n"
+        key = (event, sensor_id)
+        for subscription in self._subscribers:
+            if subscription.sensor_id is None or subscription.sensor_id == sensor_id:
+                subscription.push(key, frame)
+        STREAM_FRAMES_PUBLISHED.labels(event=event).inc()
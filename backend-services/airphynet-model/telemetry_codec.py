@@ -0,0 +1,142 @@
+"""
+Compact binary telemetry encodings accepted next to JSON by /ingest and ingestor.py.
+
+struct (Content-Type application/vnd.breev.telemetry, MQTT topic suffix /bin),
+little-endian, 17 bytes + sensor_id, fixed-point so every value decodes exactly:
+
+    uint8   version (= 1)
+    uint8   sensor_id length (0 = take it from the MQTT topic)
+    bytes   sensor_id (UTF-8)
+    int16   temperature x 100 (0.01 °C)
+    uint16  humidity x 100 (0.01 %)
+    uint32  co2_ppm x 10 (0.1 ppm)
+    uint16  aqi
+    int8    rssi
+    uint32  uptime_seconds
+
+MessagePack (Content-Type application/msgpack, MQTT topic suffix /msgpack): a map
+with the JSON field names or their one-letter short keys (see SHORT_KEYS).
+"""
+import math
+import struct
+from typing import Optional
+
+STRUCT_CONTENT_TYPE = "application/vnd.breev.telemetry"
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+STRUCT_TOPIC_SUFFIX = "bin"
+MSGPACK_TOPIC_SUFFIX = "msgpack"
+
+STRUCT_VERSION = 1
+STRUCT_HEADER = struct.Struct("<BB")
+STRUCT_BODY = struct.Struct("<hHIHbI")
+
+SHORT_KEYS = {
+    "i": "sensor_id", "t": "temperature", "h": "humidity", "c": "co2_ppm",
+    "a": "aqi", "r": "rssi", "u": "uptime_seconds",
+}
+FLOAT_FIELDS = ("temperature", "humidity", "co2_ppm")
+INT_FIELDS = ("aqi", "rssi", "uptime_seconds")
+OPTIONAL_FIELDS = ("rssi", "uptime_seconds")
+
+
+class TelemetryDecodeError(ValueError):
+    """Raised for payloads that are not valid binary telemetry"""
+
+
+def _checked(reading: dict) -> dict:
+    """Type checks for MessagePack maps, so ingestor.py validates without Pydantic"""
+    sensor_id = reading.get("sensor_id")
+    if type(sensor_id) is not str or not sensor_id:
+        raise TelemetryDecodeError("sensor_id is required")
+    for field in FLOAT_FIELDS + INT_FIELDS:
+        value = reading.get(field)
+        value_type = type(value)
+        if value_type is int:
+            continue
+        if value is None and field in OPTIONAL_FIELDS:
+            continue
+        if value_type is not float:
+            raise TelemetryDecodeError(f"{field} must be a number")
+        if field in INT_FIELDS and not value.is_integer():
+            raise TelemetryDecodeError(f"{field} must be an integer")
+        if not math.isfinite(value):
+            raise TelemetryDecodeError(f"{field} must be finite")
+    return reading
+
+
+def decode_struct(payload: bytes, sensor_id: Optional[str] = None) -> dict:
+    try:
+        version, id_length = STRUCT_HEADER.unpack_from(payload)
+        if version != STRUCT_VERSION:
+            raise TelemetryDecodeError(f"Unsupported telemetry version {version}")
+        offset = STRUCT_HEADER.size + id_length
+        if len(payload) != offset + STRUCT_BODY.size:
+            raise TelemetryDecodeError(f"Expected {offset + STRUCT_BODY.size} bytes, got {len(payload)}")
+        if id_length:
+            sensor_id = payload[STRUCT_HEADER.size:offset].decode("utf-8")
+        temperature, humidity, co2_ppm, aqi, rssi, uptime = STRUCT_BODY.unpack_from(payload, offset)
+    except (struct.error, UnicodeDecodeError) as e:
+        raise TelemetryDecodeError(f"Invalid struct telemetry: {e}")
+
+    # The layout fixes every type and cannot hold NaN; only the id can be missing
+    if not sensor_id:
+        raise TelemetryDecodeError("sensor_id is required")
+    return {
+        "sensor_id": sensor_id, "temperature": temperature / 100, "humidity": humidity / 100,
+        "co2_ppm": co2_ppm / 10, "aqi": aqi, "rssi": rssi, "uptime_seconds": uptime,
+    }
+
+
+def decode_msgpack(payload: bytes, sensor_id: Optional[str] = None, validate: bool = True) -> dict:
+    """Decode a MessagePack map; pass validate=False when Pydantic validates the result anyway"""
+    import msgpack
+
+    try:
+        raw = msgpack.unpackb(payload, raw=False)
+    except Exception as e:
+        raise TelemetryDecodeError(f"Invalid MessagePack telemetry: {e}")
+    if not isinstance(raw, dict):
+        raise TelemetryDecodeError("MessagePack telemetry must be a map")
+
+    reading = {SHORT_KEYS.get(key, key): value for key, value in raw.items()}
+    if sensor_id and "sensor_id" not in reading:
+        reading["sensor_id"] = sensor_id
+    return _checked(reading) if validate else reading
+
+
+def encode_struct(reading: dict, include_sensor_id: bool = True) -> bytes:
+    sensor_id = reading["sensor_id"].encode("utf-8") if include_sensor_id else b""
+    return (
+        STRUCT_HEADER.pack(STRUCT_VERSION, len(sensor_id)) + sensor_id
+        + STRUCT_BODY.pack(
+            round(reading["temperature"] * 100), round(reading["humidity"] * 100), round(reading["co2_ppm"] * 10),
+            reading["aqi"], reading.get("rssi", 0), reading.get("uptime_seconds", 0)
+        )
+    )
+
+
+def encode_msgpack(reading: dict) -> bytes:
+    import msgpack
+
+    long_keys = {field: key for key, field in SHORT_KEYS.items()}
+    return msgpack.packb({long_keys.get(field, field): value for field, value in reading.items()})
+
+
+def decoder_for_content_type(content_type: str):
+    """Binary decoder for an HTTP Content-Type, or None for JSON"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == STRUCT_CONTENT_TYPE:
+        return decode_struct
+    if media_type in MSGPACK_CONTENT_TYPES:
+        return decode_msgpack
+    return None
+
+
+def decoder_for_topic(topic: str):
+    """Binary decoder for an MQTT topic suffix (.../telemetry/bin, .../telemetry/msgpack), or None for JSON"""
+    suffix = topic.rsplit("/", 1)[-1]
+    if suffix == STRUCT_TOPIC_SUFFIX:
+        return decode_struct
+    if suffix == MSGPACK_TOPIC_SUFFIX:
+        return decode_msgpack
+    return None
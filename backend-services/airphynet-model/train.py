@@ -19,7 +19,7 @@ import numpy as np
 from datetime import datetime, timedelta
 import logging
 from pymongo import MongoClient
-from model import AirPhyNet, create_model
+from model import AirPhyNet, create_model, FORECAST_HORIZON
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -52,6 +52,8 @@ def train(args):
         learning_rate = args.learning_rate
         epochs = args.epochs
         batch_size = args.batch_size
+        horizon = args.horizon
+        use_physics_loss = horizon == 1
         
         # Log Params
         mlflow.log_params({
@@ -60,8 +62,9 @@ def train(args):
             "learning_rate": learning_rate,
             "epochs": epochs,
             "batch_size": batch_size,
+            "horizon": horizon,
             "optimizer": "Adam",
-            "loss_function": "PhysicsLoss + MSE"
+            "loss_function": "PhysicsLoss + MSE" if use_physics_loss else "MSE"
         })
 
         if args.data_path:
@@ -164,9 +167,10 @@ def train(args):
         seq_length = args.seq_length
         X_seq, y_seq = [], []
         
-        for i in range(len(X_raw) - seq_length):
+        # Multi-step targets: the next `horizon` values after each sequence
+        for i in range(len(X_raw) - seq_length - horizon + 1):
             X_seq.append(X_raw[i:i+seq_length])
-            y_seq.append(y_raw[i+seq_length]) 
+            y_seq.append(y_raw[i+seq_length:i+seq_length+horizon, 0])
             
         if len(X_seq) == 0:
             logger.error("Not enough data for sequence generation.")
@@ -176,7 +180,7 @@ def train(args):
         from sklearn.model_selection import train_test_split
         
         X_np = np.array(X_seq) # Shape: [N, seq_len, features]
-        y_np = np.array(y_seq) # Shape: [N, 1]
+        y_np = np.array(y_seq) # Shape: [N, horizon]
         
         X_train_np, X_test_np, y_train_np, y_test_np = train_test_split(
             X_np, y_np, test_size=0.2, shuffle=True, random_state=42
@@ -209,16 +213,16 @@ def train(args):
         X_train = torch.FloatTensor(X_train_scaled)
         y_train = torch.FloatTensor(y_train_scaled).unsqueeze(1)
         X_test = torch.FloatTensor(X_test_scaled)
-        # Note: y_test_scaled is already [N, 1], unsqueeze(1) would make it [N, 1, 1], but y_train logic above suggests [N] -> [N,1]
-        # Checking y_train_np shape: it was appended as y_raw[i+seq_length] which is [1], so y_seq is list of arrays of shape [1].
-        # y_np is [N, 1]. y_train_scaled is [N_train, 1].
+        # Note: y_test_scaled is already [N, horizon], unsqueeze(1) would make it [N, 1, horizon]
+        # Each target row is y_raw[i+seq_length : i+seq_length+horizon], so y_np is [N, horizon].
         # So torch conversion should be:
-        y_train = torch.FloatTensor(y_train_scaled) # Shape [N, 1]
-        y_test = torch.FloatTensor(y_test_scaled)   # Shape [N, 1]
+        y_train = torch.FloatTensor(y_train_scaled) # Shape [N, horizon]
+        y_test = torch.FloatTensor(y_test_scaled)   # Shape [N, horizon]
         
         # Model Init
         input_size = len(available_features)
-        model = AirPhyNet(input_size, hidden_size, num_layers, dropout_prob=args.dropout)
+        # Multi-horizon head: one output per future step, predicted in a single pass
+        model = AirPhyNet(input_size, hidden_size, num_layers, output_size=horizon, dropout_prob=args.dropout)
         # Added weight_decay for L2 Regularization
         optimizer = optim.Adam(model.parameters(), lr=learning_rate, weight_decay=1e-4)
         criterion = nn.MSELoss()
@@ -234,11 +238,17 @@ def train(args):
             output = model(X_train)
             loss = criterion(output, y_train)
             
-            # Physics loss might be unstable if predictions are wild
-            p_loss = model.physics_loss(output, X_train)
-            
-            # Weighted physics loss (reduce weight if causing instability)
-            total_loss = loss + 0.01 * p_loss 
+            # physics_loss differentiates along dim 1, which is time for a sequence output but the
+            # forecast horizon for the multi-horizon head: there it would only push every forecast
+            # towards a flat line, so the term is off unless the head predicts a single step
+            if use_physics_loss:
+                # Physics loss might be unstable if predictions are wild
+                p_loss = model.physics_loss(output, X_train)
+                
+                # Weighted physics loss (reduce weight if causing instability)
+                total_loss = loss + 0.01 * p_loss 
+            else:
+                total_loss = loss
             
             if torch.isnan(total_loss):
                 logger.error(f"Loss became NaN at epoch {epoch}! Stopping training.")
@@ -296,6 +306,7 @@ if __name__ == "__main__":
     parser.add_argument("--num_layers", type=int, default=2)
     parser.add_argument("--seq_length", type=int, default=10)
     parser.add_argument("--batch_size", type=int, default=32)
+    parser.add_argument("--horizon", type=int, default=FORECAST_HORIZON, help="Number of future steps predicted in one pass")
     parser.add_argument("--dropout", type=float, default=0.2, help="Dropout probability")
     parser.add_argument("--data_path", type=str, default=None, help="Path to CSV dataset")
     
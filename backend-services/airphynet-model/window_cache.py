@@ -0,0 +1,134 @@
+import os
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, Sequence
+
+from prometheus_client import Counter, Gauge
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Configuration
+WINDOW_CACHE_SIZE = int(os.getenv("WINDOW_CACHE_SIZE", 24))                  # Readings kept per sensor
+WINDOW_CACHE_MAX_SENSORS = int(os.getenv("WINDOW_CACHE_MAX_SENSORS", 10000))
+WINDOW_CACHE_IDLE_SECONDS = float(os.getenv("WINDOW_CACHE_IDLE_SECONDS", 3600))
+# Re-seed from MongoDB when no reading was appended locally for this long, 0 = never
+WINDOW_CACHE_FRESH_SECONDS = float(os.getenv("WINDOW_CACHE_FRESH_SECONDS", 60))
+
+# Feature order expected by the model: (Temp, Hum, CO2, AQI)
+NUM_FEATURES = 4
+
+# Prometheus Metrics
+WINDOW_CACHE_REQUESTS = Counter('window_cache_requests_total', 'Rolling window cache lookups', ['result'])   # hit | miss | stale
+WINDOW_CACHE_SENSORS = Gauge('window_cache_sensors', 'Sensors currently held in the rolling window cache')
+
+
+class _RingBuffer:
+    """Fixed-size array of the most recent readings of one sensor"""
+
+    __slots__ = ("data", "head", "count", "last_seen", "reading_at")
+
+    def __init__(self, capacity: int):
+        # Imported on first use so importing the API does not pay for numpy
+        import numpy as np
+
+        self.data = np.zeros((capacity, NUM_FEATURES), dtype=np.float32)
+        self.head = 0       # Next slot to write
+        self.count = 0
+        self.last_seen = time.monotonic()
+        self.reading_at = None   # Server timestamp of the newest reading
+
+    def append(self, reading: Sequence[float], reading_at=None):
+        self.data[self.head] = reading
+        self.head = (self.head + 1) % len(self.data)
+        self.count = min(self.count + 1, len(self.data))
+        self.last_seen = time.monotonic()
+        self.reading_at = reading_at
+
+    def ordered(self) -> "np.ndarray":
+        """Readings oldest first, as a new [count, 4] array"""
+        import numpy as np
+
+        if self.count < len(self.data):
+            return self.data[:self.count].copy()
+        return np.concatenate((self.data[self.head:], self.data[:self.head]))
+
+
+class SensorWindowCache:
+    """
+    Per-sensor rolling window of recent readings, so /predict does not need a
+    MongoDB round trip.
+
+    Sensors are seeded lazily from MongoDB on the first miss; after that /ingest
+    appends every accepted reading. Readings for sensors that are not cached are
+    ignored, because the next seed reads them back from MongoDB anyway. Sensors
+    that stay idle longer than `idle_seconds` are evicted, and the least recently
+    updated sensor is dropped once `max_sensors` is reached.
+
+    Only this process's HTTP ingest appends: readings stored by the MQTT
+    ingestor or another API worker never reach the window. A window without a
+    local append for `fresh_seconds` is therefore treated as stale and
+    re-seeded; set it to 0 only when HTTP ingest on a single worker is the one
+    write path.
+    """
+
+    def __init__(self, capacity: int = WINDOW_CACHE_SIZE, max_sensors: int = WINDOW_CACHE_MAX_SENSORS,
+                 idle_seconds: float = WINDOW_CACHE_IDLE_SECONDS, fresh_seconds: float = WINDOW_CACHE_FRESH_SECONDS):
+        self.capacity = max(1, capacity)
+        self.max_sensors = max(1, max_sensors)
+        self.idle_seconds = idle_seconds
+        self.fresh_seconds = fresh_seconds
+        self._buffers: "OrderedDict[str, _RingBuffer]" = OrderedDict()
+
+    def _fresh(self, buffer: _RingBuffer) -> bool:
+        return self.fresh_seconds <= 0 or time.monotonic() - buffer.last_seen <= self.fresh_seconds
+
+    def get(self, sensor_id: str) -> Optional["np.ndarray"]:
+        """Return the cached window (oldest first), or None on a miss or a stale window"""
+        self.evict_idle()
+        buffer = self._buffers.get(sensor_id)
+        if buffer is None:
+            WINDOW_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+        if not self._fresh(buffer):
+            WINDOW_CACHE_REQUESTS.labels(result="stale").inc()
+            return None
+
+        WINDOW_CACHE_REQUESTS.labels(result="hit").inc()
+        return buffer.ordered()
+
+    def latest_reading_at(self, sensor_id: str):
+        """Timestamp of the newest cached reading of a sensor, or None if it is not cached or stale"""
+        buffer = self._buffers.get(sensor_id)
+        return buffer.reading_at if buffer is not None and self._fresh(buffer) else None
+
+    def seed(self, sensor_id: str, readings: Sequence[Sequence[float]], reading_at=None):
+        """Replace a sensor's window with readings loaded from MongoDB (oldest first)"""
+        buffer = _RingBuffer(self.capacity)
+        for reading in list(readings)[-self.capacity:]:
+            buffer.append(reading)
+        buffer.reading_at = reading_at
+
+        self._buffers[sensor_id] = buffer
+        self._buffers.move_to_end(sensor_id)
+        while len(self._buffers) > self.max_sensors:
+            self._buffers.popitem(last=False)
+        WINDOW_CACHE_SENSORS.set(len(self._buffers))
+
+    def append(self, sensor_id: str, reading: Sequence[float], reading_at=None):
+        """Add a freshly ingested reading if the sensor is cached"""
+        buffer = self._buffers.get(sensor_id)
+        if buffer is not None:
+            buffer.append(reading, reading_at)
+            self._buffers.move_to_end(sensor_id)
+
+    def evict_idle(self):
+        """Drop sensors that have not received a reading within the idle TTL"""
+        cutoff = time.monotonic() - self.idle_seconds
+        # Buffers are kept in update order, so stop at the first recent one
+        while self._buffers:
+            sensor_id, buffer = next(iter(self._buffers.items()))
+            if buffer.last_seen >= cutoff:
+                break
+            del self._buffers[sensor_id]
+        WINDOW_CACHE_SENSORS.set(len(self._buffers))
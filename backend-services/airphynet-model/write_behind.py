@@ -0,0 +1,140 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo.errors import BulkWriteError
+
+from spool import Spool
+
+# Configuration
+INGEST_WRITE_BEHIND = os.getenv("INGEST_WRITE_BEHIND", "false").lower() == "true"
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", 10000))
+WRITE_BEHIND_FLUSH_SIZE = int(os.getenv("WRITE_BEHIND_FLUSH_SIZE", 500))
+WRITE_BEHIND_FLUSH_INTERVAL_MS = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_MS", 200))
+RETRY_BACKOFF_MAX_SECONDS = 30
+
+# Prometheus Metrics
+WRITE_BEHIND_DEPTH = Gauge('ingest_write_behind_queue_depth', 'Readings waiting to be written to MongoDB')
+WRITE_BEHIND_FLUSH_SIZE_HIST = Histogram(
+    'ingest_write_behind_flush_size', 'Documents written per flush',
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+)
+WRITE_BEHIND_FLUSH_LATENCY = Histogram('ingest_write_behind_flush_seconds', 'insert_many latency per flush')
+WRITE_BEHIND_REJECTED = Counter('ingest_write_behind_rejected_total', 'Readings rejected because the queue was full')
+WRITE_BEHIND_FAILURES = Counter('ingest_write_behind_flush_failures_total', 'Flushes that failed and will be retried')
+
+
+class WriteBehindBuffer:
+    """
+    Bounded in-memory queue of validated documents, written to MongoDB by a
+    background flusher once `flush_size` documents are waiting or every
+    `flush_interval_ms`. `offer` returns False when the queue is full so the
+    caller can apply backpressure. A failed flush keeps its documents at the
+    head of the queue and is retried with capped exponential backoff, unless a
+    `spool` takes them (it also takes every flush while it holds a backlog).
+    """
+
+    def __init__(self, writer: Callable[[List[dict]], Awaitable], max_queue: int = WRITE_BEHIND_MAX_QUEUE,
+                 flush_size: int = WRITE_BEHIND_FLUSH_SIZE, flush_interval_ms: float = WRITE_BEHIND_FLUSH_INTERVAL_MS,
+                 spool: Optional[Spool] = None):
+        self.writer = writer
+        self.spool = spool
+        self.max_queue = max(1, max_queue)
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = max(1.0, flush_interval_ms) / 1000.0
+
+        self._docs: List[dict] = []
+        self._wakeup = None
+        self._stopped = None
+        self._flusher = None
+        self._stopping = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    def start(self):
+        if self._flusher is None:
+            self._wakeup = asyncio.Event()
+            self._stopped = asyncio.Event()
+            self._flusher = asyncio.create_task(self._run())
+
+    def offer(self, doc: dict) -> bool:
+        """Queue a document for writing; False means the caller should back off"""
+        if len(self._docs) >= self.max_queue:
+            WRITE_BEHIND_REJECTED.inc()
+            return False
+
+        self._docs.append(doc)
+        WRITE_BEHIND_DEPTH.set(len(self._docs))
+        if len(self._docs) >= self.flush_size and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    async def _run(self):
+        backoff = 0.5
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if await self.flush():
+                backoff = 0.5
+                continue
+
+            # MongoDB is failing and nothing spooled the batch: back off instead of retrying every cycle
+            print(f"Write-behind: {len(self._docs)} documents kept for retry in {backoff:.1f}s")
+            try:
+                await asyncio.wait_for(self._stopped.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2, RETRY_BACKOFF_MAX_SECONDS)
+
+    async def flush(self) -> bool:
+        """Write everything queued so far; returns False if a flush failed"""
+        while self._docs:
+            batch = self._docs[:self.flush_size]
+            if not await self._write(batch):
+                return False
+            # Only the flusher removes documents, and new ones are appended at the end
+            del self._docs[:len(batch)]
+            WRITE_BEHIND_DEPTH.set(len(self._docs))
+        return True
+
+    async def _write(self, batch: List[dict]) -> bool:
+        """insert_many, or the spool; False if the batch has to stay queued"""
+        if self.spool is not None and len(self.spool) and await self.spool.append_async(batch):
+            return True
+
+        start = time.perf_counter()
+        try:
+            await self.writer(batch)
+        except BulkWriteError as e:
+            # Per-document errors (e.g. duplicates) will not succeed on retry
+            print(f"Write-behind: {len(e.details.get('writeErrors', []))} documents rejected by MongoDB")
+        except Exception as e:
+            WRITE_BEHIND_FAILURES.inc()
+            if self.spool is not None and await self.spool.append_async(batch):
+                print(f"Write-behind flush failed ({e}). {len(batch)} documents spooled for replay.")
+                return True
+            print(f"Write-behind flush failed ({e}).")
+            return False
+
+        WRITE_BEHIND_FLUSH_LATENCY.observe(time.perf_counter() - start)
+        WRITE_BEHIND_FLUSH_SIZE_HIST.observe(len(batch))
+        return True
+
+    async def stop(self):
+        """Stop the flusher and drain the queue before shutdown"""
+        if self._flusher is not None:
+            # Let an in-flight insert_many finish instead of cancelling it mid-write
+            self._stopping = True
+            self._wakeup.set()
+            self._stopped.set()
+            await self._flusher
+            self._flusher = None
+
+        if not await self.flush():
+            print(f"Warning: Write-behind shutdown with {len(self._docs)} unwritten documents")
@@ -0,0 +1,73 @@
+import requests
+import os
+import json
+import time
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+BASE_URL = os.getenv("BENCH_BASE_URL", "http://localhost:8000") # Local Docker or Cloudflare URL
+API_KEY = os.getenv("API_SECRET_KEY", "sk_live_default_setup_key_change_me")
+
+def make_readings(count):
+    return [{
+        "sensor_id": f"bench_gateway_{i % 20}",
+        "temperature": 25.0 + (i % 10) * 0.1,
+        "humidity": 55.0,
+        "co2_ppm": 450.0 + (i % 50),
+        "aqi": 40,
+        "uptime_seconds": i
+    } for i in range(count)]
+
+def bench_single(readings):
+    """One POST /ingest per reading (current gateway replay behaviour)"""
+    session = requests.Session()
+    headers = {"x-api-key": API_KEY}
+    start = time.perf_counter()
+    for reading in readings:
+        session.post(f"{BASE_URL}/ingest", json=reading, headers=headers).raise_for_status()
+    return time.perf_counter() - start
+
+def bench_batch_json(readings, batch_size):
+    session = requests.Session()
+    headers = {"x-api-key": API_KEY}
+    start = time.perf_counter()
+    for i in range(0, len(readings), batch_size):
+        r = session.post(f"{BASE_URL}/ingest/batch", json=readings[i:i + batch_size], headers=headers)
+        r.raise_for_status()
+    return time.perf_counter() - start
+
+def bench_batch_ndjson(readings, batch_size):
+    session = requests.Session()
+    headers = {"x-api-key": API_KEY, "Content-Type": "application/x-ndjson"}
+    start = time.perf_counter()
+    for i in range(0, len(readings), batch_size):
+        # Generator body -> chunked transfer, like a gateway streaming its buffer
+        lines = (json.dumps(reading).encode() + b"\n" for reading in readings[i:i + batch_size])
+        r = session.post(f"{BASE_URL}/ingest/batch", data=lines, headers=headers)
+        r.raise_for_status()
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare /ingest against /ingest/batch throughput")
+    parser.add_argument("--single", type=int, default=500, help="Readings sent one request at a time")
+    parser.add_argument("--batch", type=int, default=20000, help="Readings sent through /ingest/batch")
+    parser.add_argument("--batch_size", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"--- Breev Ingest Benchmark ({BASE_URL}) ---")
+    single = make_readings(args.single)
+    batch = make_readings(args.batch)
+
+    elapsed = bench_single(single)
+    single_rate = len(single) / elapsed
+    print(f"/ingest (1 per request):      {single_rate:>10.0f} readings/s")
+
+    elapsed = bench_batch_json(batch, args.batch_size)
+    print(f"/ingest/batch (JSON array):   {len(batch) / elapsed:>10.0f} readings/s  ({len(batch) / elapsed / single_rate:.1f}x)")
+
+    elapsed = bench_batch_ndjson(batch, args.batch_size)
+    print(f"/ingest/batch (NDJSON):       {len(batch) / elapsed:>10.0f} readings/s  ({len(batch) / elapsed / single_rate:.1f}x)")
+    print("\nBenchmark readings use sensor_id 'bench_gateway_*'; delete them from sensor_logs afterwards.")
@@ -10,6 +10,14 @@ db.createCollection('users');
 // Create indexes for better performance
 db.sensor_logs.createIndex({ "sensor_id": 1, "timestamp": -1 });
 db.sensor_logs.createIndex({ "timestamp": -1 });
+// Prediction windows (/predict and the scheduled fleet forecast) are read by received_at
+db.sensor_logs.createIndex({ "sensor_id": 1, "received_at": -1 });
+db.sensor_logs.createIndex({ "received_at": -1 });
+// Duplicate readings (QoS1 redeliveries, bridge re-forwards) are refused by the ingestor's dedup_key
+db.sensor_logs.createIndex(
+    { "sensor_id": 1, "dedup_key": 1 },
+    { name: "sensor_id_dedup_key_unique", unique: true, partialFilterExpression: { "dedup_key": { "$exists": true } } }
+);
 db.devices.createIndex({ "sensor_id": 1 }, { unique: true });
 db.predictions.createIndex({ "sensor_id": 1, "generated_at": -1 });
 
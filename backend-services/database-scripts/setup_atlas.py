@@ -23,6 +23,14 @@ print("Creating collections and indexes...")
 # 1. Sensor Logs
 db.sensor_logs.create_index([("sensor_id", 1), ("timestamp", -1)])
 db.sensor_logs.create_index([("timestamp", -1)])
+# Prediction windows (/predict and the scheduled fleet forecast) are read by received_at
+db.sensor_logs.create_index([("sensor_id", 1), ("received_at", -1)])
+db.sensor_logs.create_index([("received_at", -1)])
+# Duplicate readings (QoS1 redeliveries, bridge re-forwards) are refused by the ingestor's dedup_key
+db.sensor_logs.create_index(
+    [("sensor_id", 1), ("dedup_key", 1)],
+    name="sensor_id_dedup_key_unique", unique=True, partialFilterExpression={"dedup_key": {"$exists": True}}
+)
 print(" - sensor_logs indexes created")
 
 # 2. Devices
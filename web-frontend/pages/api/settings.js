@@ -33,6 +33,18 @@ export default async function handler(req, res) {
                 { upsert: true }
             );
 
+            // The AirPhyNet API caches settings (incl. the API key); drop its copy so a new key works at once
+            try {
+                const airphynetUrl = process.env.AIRPHYNET_API_URL;
+                if (!airphynetUrl) throw new Error("AIRPHYNET_API_URL is not set");
+                await fetch(`${airphynetUrl}/settings/refresh`, {
+                    method: 'POST',
+                    headers: { 'x-api-key': process.env.API_SECRET_KEY },
+                });
+            } catch (error) {
+                console.error('Error refreshing AirPhyNet settings cache:', error);
+            }
+
             res.status(200).json({ message: 'Settings saved successfully' });
 
         } else {